@@ -0,0 +1,233 @@
+"""
+Admission control for the interview endpoints (ADMISSION_CONTROL).
+
+Every answer turns into one or more Gemini calls, so during a spike letting
+everything through only piles requests up until gunicorn times them out.
+admission_control_middleware (api/middleware.py) decides before the view
+runs. Under WSGI that is also before the upload is read, so a rejected
+answer costs no upload time; under ASGI Django's handler has already
+buffered the whole body by then, and a rejection only saves the model
+calls:
+
+- a token bucket per client (ADMISSION_RATE requests/s, bursts of
+  ADMISSION_BURST; off by default): over it the request gets 429, with
+  Retry-After set to the time until the next token. Clients are told apart
+  by address, so behind a proxy it needs ADMISSION_PROXY_HOPS
+- a concurrency limit per endpoint (ADMISSION_CONCURRENCY): requests over
+  it wait in a bounded queue (ADMISSION_QUEUE waiters for at most
+  ADMISSION_QUEUE_TIMEOUT seconds); a full queue or an expired wait gets
+  503, with Retry-After estimated from the queue depth and the endpoint's
+  recent service time
+
+Limits are per worker process, like the upstream limiter in api/llm.py.
+The concurrency limits therefore only matter for workers that serve
+requests concurrently (ASGI, or gunicorn's gthread worker): a sync worker
+never has more than one request in flight, and excess load waits in
+gunicorn's listen backlog instead. Streamed responses keep their slot until
+the stream ends.
+"""
+import math
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class Rejected(Exception):
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _retry_after(seconds):
+    return max(1, min(settings.ADMISSION_RETRY_AFTER_MAX, math.ceil(seconds)))
+
+
+class EndpointGate:
+    """At most ``limit`` requests in flight, ``queue`` more waiting up to ``wait`` seconds"""
+
+    def __init__(self, name, limit, queue, wait):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.wait = wait
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.service_seconds = 1.0  # moving average, for Retry-After
+        self._cond = threading.Condition()
+
+    def _admit(self):
+        self.in_flight += 1
+        self.admitted += 1
+        return self._releaser(time.monotonic())
+
+    def _reject(self, reason):
+        self.rejected += 1
+        # Everyone queued ahead, drained through ``limit`` slots
+        retry_after = _retry_after((self.waiting + 1) / self.limit * self.service_seconds)
+        raise Rejected(503, reason, retry_after)
+
+    def acquire(self):
+        """Return a release callable, or raise Rejected"""
+        with self._cond:
+            if self.in_flight < self.limit:
+                return self._admit()
+            if self.waiting >= self.queue:
+                self._reject("queue_full")
+            self.waiting += 1
+            self.queued += 1
+            try:
+                free = self._cond.wait_for(lambda: self.in_flight < self.limit, timeout=self.wait)
+            finally:
+                self.waiting -= 1
+            if not free:
+                self._reject("queue_timeout")
+            return self._admit()
+
+    async def aacquire(self):
+        with self._cond:
+            if self.in_flight < self.limit:
+                return self._admit()
+            if self.waiting >= self.queue:
+                self._reject("queue_full")
+            self.waiting += 1
+            self.queued += 1
+        # Poll with backoff so a full gate never blocks the event loop
+        deadline = time.monotonic() + self.wait
+        delay = 0.005
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                with self._cond:
+                    if self.in_flight < self.limit:
+                        return self._admit()
+                    if time.monotonic() >= deadline:
+                        self._reject("queue_timeout")
+                delay = min(delay * 2, 0.1)
+        finally:
+            with self._cond:
+                self.waiting -= 1
+
+    def _releaser(self, started):
+        released = []
+
+        def release():
+            if released:
+                return
+            released.append(True)
+            with self._cond:
+                self.in_flight -= 1
+                self.service_seconds += 0.2 * (time.monotonic() - started - self.service_seconds)
+                self._cond.notify()
+        return release
+
+    def stats(self):
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "service_seconds": round(self.service_seconds, 3),
+            }
+
+
+class RateLimiter:
+    """Token bucket per client key, the least recently seen clients forgotten past ``max_clients``"""
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.limited = 0
+        self._buckets = OrderedDict()  # client -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def check(self, client):
+        """Take a token for ``client``, or raise Rejected"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            else:
+                self.limited += 1
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        if not allowed:
+            raise Rejected(429, "rate_limited", _retry_after((1 - tokens) / self.rate))
+
+    def stats(self):
+        with self._lock:
+            return {"clients": len(self._buckets), "limited": self.limited}
+
+
+_gates = {}
+_limiter = None
+_lock = threading.Lock()
+
+
+def get_gate(endpoint):
+    """The gate for a URL name, or None when the endpoint isn't admission controlled"""
+    limit = settings.ADMISSION_CONCURRENCY.get(endpoint)
+    if not limit:
+        return None
+    with _lock:
+        gate = _gates.get(endpoint)
+        if gate is None:
+            gate = _gates[endpoint] = EndpointGate(
+                endpoint, limit, settings.ADMISSION_QUEUE, settings.ADMISSION_QUEUE_TIMEOUT
+            )
+    return gate
+
+
+def get_rate_limiter():
+    """This worker's per-client rate limiter, or None when ADMISSION_RATE is 0"""
+    global _limiter
+    if settings.ADMISSION_RATE <= 0:
+        return None
+    with _lock:
+        if _limiter is None:
+            _limiter = RateLimiter(settings.ADMISSION_RATE, settings.ADMISSION_BURST)
+    return _limiter
+
+
+def client_key(request):
+    """
+    The client's address: with ADMISSION_PROXY_HOPS trusted proxies in front,
+    the address the outermost one saw in X-Forwarded-For
+    """
+    hops = settings.ADMISSION_PROXY_HOPS
+    forwarded = [part.strip() for part in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if part.strip()]
+    if hops and len(forwarded) >= hops:
+        return forwarded[-hops]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def check_rate(request):
+    """Take a token from the client's bucket, or raise Rejected"""
+    limiter = get_rate_limiter()
+    if limiter:
+        limiter.check(client_key(request))
+
+
+def stats():
+    with _lock:
+        gates = dict(_gates)
+    limiter = _limiter
+    return {
+        "endpoints": {name: gate.stats() for name, gate in gates.items()},
+        "rate_limiter": limiter.stats() if limiter else {},
+    }
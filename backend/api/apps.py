@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class ApiConfig(AppConfig):
+    name = 'api'
+
+    def ready(self):
+        from .sqlite import configure_connection
+        connection_created.connect(configure_connection, dispatch_uid="api.sqlite.configure_connection")
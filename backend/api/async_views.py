@@ -0,0 +1,366 @@
+"""
+Async versions of the interview endpoints for the ASGI stack.
+
+Enabled with ASYNC_VIEWS=True and served by an ASGI worker, e.g.
+
+    gunicorn mockmate.asgi:application -k uvicorn.workers.UvicornWorker
+
+Model calls are awaited, so a single worker keeps many interviews in flight
+instead of blocking for each Gemini round-trip.
+"""
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from .sessions import get_session_store, SessionLockTimeout
+from .transcription import get_transcriber
+from .audio import read_upload
+from .streaming import chunked_uploads, ChunkError, expected_chunks
+from .openers import get_opener_pool
+from .replay import get_replay_cache
+from . import interview, context, prefetch, pipeline, llm, replay, metrics, jobs, history, parsing, preprocess
+
+logger = logging.getLogger(__name__)
+
+session_store = get_session_store()
+replies = get_replay_cache()
+
+
+@require_GET
+async def get_question(request):
+    """Start a new interview or get the first question"""
+    topic = request.GET.get("topic", "general")
+    logger.info(f"Starting interview for topic: {topic}")
+
+    try:
+        pool = get_opener_pool()
+        opener = pool.take(topic) if pool else None
+        if opener:
+            greeting, question = opener
+        else:
+            with metrics.stage("question", "generation"):
+                response = await llm.agenerate(interview.opening_prompt(topic), parsing.generation_config("opening"))
+            greeting, question = interview.parse_opening(response.text.strip())
+
+        session = interview.new_session(topic, greeting, question, request.GET.get("client_id", "")[:64])
+        # The server picks the session ID; a client can't choose or reuse one
+        with metrics.stage("question", "session_save"):
+            session_id = await session_store.acreate(session)
+        logger.info(f"Started interview session {session_id}")
+        await sync_to_async(history.start_interview)(session_id, session)
+        prefetch.schedule(session_id, interview.current_question_id(session_id, session), session)
+
+        return JsonResponse(interview.opening_payload(session_id, greeting, question))
+
+    except Exception as e:
+        logger.error(f"Error in get_question: {str(e)}", exc_info=True)
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+@require_POST
+async def submit_answer(request):
+    """Process answer and get feedback + next question"""
+    try:
+        audio_file = request.FILES.get("audio")
+        question_id = request.POST.get("question_id")
+        session_id = request.POST.get("session_id")
+
+        if not question_id or not session_id:
+            return JsonResponse({"error": "Missing session or question ID"}, status=400)
+
+        try:
+            chunks = expected_chunks(request.POST.get("chunks"))
+        except ChunkError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        with metrics.stage("answer", "upload"):
+            audio_bytes = read_upload(audio_file) if audio_file else None
+        if audio_bytes is not None:
+            metrics.AUDIO_BYTES.observe(len(audio_bytes))
+        mime_type = (audio_file.content_type or "audio/webm") if audio_file else None
+        session = await session_store.aget(session_id)
+        if not session:
+            return JsonResponse({"error": "Interview session not found"}, status=400)
+        reply_key = replay.answer_key(session_id, session.get("nonce", ""), question_id, audio_bytes)
+        stored = await replies.aget(reply_key)
+        if stored is not None:
+            return replay.replayed(reply_key, stored)
+
+        if audio_bytes is None and not chunked_uploads.has(session_id, question_id):
+            return JsonResponse({"error": "No audio file provided"}, status=400)
+
+        try:
+            audio_bytes, mime_type = await _prepare_audio("answer", audio_bytes, mime_type)
+        except preprocess.NoSpeechError:
+            return JsonResponse({
+                "error": "No clear speech detected. Please try speaking more clearly.",
+                "transcript": ""
+            }, status=400)
+
+        try:
+            async with session_store.alock(session_id):
+                stored = await replies.aget(reply_key)
+                if stored is not None:
+                    return replay.replayed(reply_key, stored)
+                session = await session_store.aget(session_id)
+                if not interview.is_active(session):
+                    return JsonResponse({"error": "Interview session not found"}, status=400)
+                return await _process_answer(session_id, question_id, session, audio_bytes, mime_type, reply_key, chunks)
+        except SessionLockTimeout:
+            return JsonResponse({"error": "Previous answer for this session is still being processed"}, status=409)
+        except ChunkError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+    except Exception as e:
+        logger.error(f"Error in submit_answer: {str(e)}", exc_info=True)
+        return JsonResponse({"error": f"Processing failed: {str(e)}"}, status=500)
+
+
+async def _process_answer(session_id, question_id, session, audio_bytes, mime_type, reply_key, chunks=None):
+    """Transcribe an answer, generate feedback and advance the session"""
+    logger.info(f"Processing answer for session {session_id}, question {question_id}")
+
+    serial = audio_bytes is None or pipeline.mode() == "serial"
+    if serial:
+        with metrics.stage("answer", "transcription"):
+            transcript = await _transcribe_answer(session_id, question_id, audio_bytes, mime_type, chunks)
+    else:
+        candidates = await prefetch.atake(question_id) if pipeline.mode() == "concurrent" else None
+        with metrics.stage("answer", f"pipeline_{pipeline.mode()}"):
+            transcript, feedback, next_question = await pipeline.arun(session, audio_bytes, mime_type, candidates)
+
+    if not interview.is_usable_transcript(transcript):
+        return JsonResponse({
+            "error": "No clear speech detected. Please try speaking more clearly.",
+            "transcript": transcript
+        }, status=400)
+
+    interview.record_answer(session, transcript)
+
+    if serial:
+        candidates = await prefetch.atake(question_id)
+        with metrics.stage("answer", "generation"):
+            response = await llm.agenerate(context.answer_prompt(session, candidates), parsing.generation_config("answer"))
+        with metrics.stage("answer", "parsing"):
+            feedback, next_question = interview.parse_feedback(response.text.strip())
+            if candidates:
+                next_question = prefetch.resolve(next_question, candidates)
+
+    interview.record_feedback(session, feedback, next_question)
+    with metrics.stage("answer", "session_save"):
+        await session_store.asave(session_id, session)
+    await sync_to_async(history.record_turn)(session_id, session)
+    context.schedule_compaction(session_id, session)
+    prefetch.schedule(session_id, interview.current_question_id(session_id, session), session)
+
+    payload = interview.answer_payload(session_id, session, transcript, feedback, next_question)
+    await replies.aset(reply_key, payload)
+    return JsonResponse(payload)
+
+
+async def _prepare_audio(endpoint, audio_bytes, mime_type):
+    """Trim and re-encode a whole upload, see api.views._prepare_audio"""
+    if audio_bytes is None or not preprocess.enabled():
+        return audio_bytes, mime_type
+    with metrics.stage(endpoint, "preprocess"):
+        return await sync_to_async(preprocess.prepare, thread_sensitive=False)(audio_bytes, mime_type)
+
+
+async def _transcribe_answer(session_id, question_id, audio_bytes, mime_type, chunks=None):
+    """Transcribe a full upload, or finish an answer streamed through answer/chunk/"""
+    if audio_bytes is None:
+        return await sync_to_async(chunked_uploads.finish, thread_sensitive=False)(session_id, question_id, chunks)
+    return await get_transcriber().atranscribe(audio_bytes, mime_type)
+
+
+@csrf_exempt
+@require_POST
+async def upload_chunk(request):
+    """Accept one chunk of an answer recording, see api.views.upload_chunk"""
+    chunk = request.FILES.get("audio")
+    question_id = request.POST.get("question_id")
+    session_id = request.POST.get("session_id")
+
+    if not chunk:
+        return JsonResponse({"error": "No audio chunk provided"}, status=400)
+
+    if not question_id or not session_id:
+        return JsonResponse({"error": "Missing session or question ID"}, status=400)
+
+    try:
+        seq = int(request.POST.get("seq"))
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "Invalid chunk sequence number"}, status=400)
+
+    if seq == 0 and not interview.is_active(await session_store.aget(session_id)):
+        return JsonResponse({"error": "Interview session not found"}, status=400)
+
+    try:
+        answer = await sync_to_async(chunked_uploads.append, thread_sensitive=False)(
+            session_id, question_id, seq, read_upload(chunk), chunk.content_type or "audio/webm"
+        )
+    except ChunkError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({
+        "session_id": session_id,
+        "question_id": question_id,
+        "received": seq,
+        "bytes": len(answer.buffer)
+    })
+
+
+@csrf_exempt
+@require_POST
+async def submit_answer_stream(request):
+    """Streaming variant of submit_answer (server-sent events), see api.views"""
+    audio_file = request.FILES.get("audio")
+    question_id = request.POST.get("question_id")
+    session_id = request.POST.get("session_id")
+
+    if not question_id or not session_id:
+        return JsonResponse({"error": "Missing session or question ID"}, status=400)
+
+    try:
+        chunks = expected_chunks(request.POST.get("chunks"))
+    except ChunkError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    audio_bytes = read_upload(audio_file) if audio_file else None
+    mime_type = (audio_file.content_type or "audio/webm") if audio_file else None
+    session = await session_store.aget(session_id)
+    if not session:
+        return JsonResponse({"error": "Interview session not found"}, status=400)
+    reply_key = replay.answer_key(session_id, session.get("nonce", ""), question_id, audio_bytes)
+    stored = await replies.aget(reply_key)
+    if stored is None and audio_bytes is None and not chunked_uploads.has(session_id, question_id):
+        return JsonResponse({"error": "No audio file provided"}, status=400)
+
+    if stored is None:
+        try:
+            audio_bytes, mime_type = await _prepare_audio("answer_stream", audio_bytes, mime_type)
+        except preprocess.NoSpeechError:
+            return JsonResponse({
+                "error": "No clear speech detected. Please try speaking more clearly.",
+                "transcript": ""
+            }, status=400)
+
+    response = StreamingHttpResponse(_stream_answer(session_id, question_id, audio_bytes, mime_type, reply_key, chunks), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def _stream_answer(session_id, question_id, audio_bytes, mime_type, reply_key, chunks=None):
+    """Generate the SSE events for one answer while holding the session lock"""
+    try:
+        async with session_store.alock(session_id):
+            stored = await replies.aget(reply_key)
+            if stored is not None:
+                for event in replay.replayed_events(stored):
+                    yield event
+                return
+            session = await session_store.aget(session_id)
+            if not interview.is_active(session):
+                yield interview.sse_event("error", {"error": "Interview session not found", "status": 400})
+                return
+
+            with metrics.stage("answer_stream", "transcription"):
+                transcript = await _transcribe_answer(session_id, question_id, audio_bytes, mime_type, chunks)
+            yield interview.sse_event("transcript", {"transcript": transcript})
+
+            if not interview.is_usable_transcript(transcript):
+                yield interview.sse_event("error", {
+                    "error": "No clear speech detected. Please try speaking more clearly.",
+                    "transcript": transcript,
+                    "status": 400
+                })
+                return
+
+            interview.record_answer(session, transcript)
+
+            parser = interview.FeedbackStreamParser()
+            with metrics.stage("answer_stream", "generation"):
+                async for chunk in llm.astream(context.answer_prompt(session)):
+                    for section, delta in parser.feed(chunk.text):
+                        yield interview.sse_event(section, {"delta": delta})
+            tail, (feedback, next_question) = parser.finish()
+            for section, delta in tail:
+                yield interview.sse_event(section, {"delta": delta})
+
+            interview.record_feedback(session, feedback, next_question)
+            with metrics.stage("answer_stream", "session_save"):
+                await session_store.asave(session_id, session)
+            await sync_to_async(history.record_turn)(session_id, session)
+            context.schedule_compaction(session_id, session)
+            prefetch.schedule(session_id, interview.current_question_id(session_id, session), session)
+
+            payload = interview.answer_payload(session_id, session, transcript, feedback, next_question)
+            await replies.aset(reply_key, payload)
+            yield interview.sse_event("done", payload)
+
+    except SessionLockTimeout:
+        yield interview.sse_event("error", {"error": "Previous answer for this session is still being processed", "status": 409})
+    except ChunkError as e:
+        yield interview.sse_event("error", {"error": str(e), "status": 400})
+    except Exception as e:
+        logger.error(f"Error in submit_answer_stream: {str(e)}", exc_info=True)
+        yield interview.sse_event("error", {"error": f"Processing failed: {str(e)}", "status": 500})
+
+
+@csrf_exempt
+@require_POST
+async def end_interview(request):
+    """End the interview and get final feedback"""
+    try:
+        data = json.loads(request.body)
+        session_id = data.get("session_id")
+
+        session = await session_store.aget(session_id)
+        if not session:
+            return JsonResponse({"error": "Session not found"}, status=400)
+
+        reply_key = replay.end_key(session_id, session.get("nonce", ""))
+        stored = await replies.aget(reply_key)
+        if stored is not None:
+            return replay.replayed(reply_key, stored)
+        if not interview.is_active(session):
+            return JsonResponse({"error": "Interview has already ended"}, status=400)
+
+        if settings.SUMMARY_JOBS:
+            job = await jobs.asubmit(session_id, session.get("nonce", ""))
+            return JsonResponse(jobs.public(job), status=202)
+
+        # The whole interview is evaluated, not the rolling summary
+        prompt = interview.summary_prompt(session["topic"], context.full_context(session))
+        try:
+            with metrics.stage("end", "generation"):
+                response = await llm.agenerate(prompt)
+        except Exception:
+            await sync_to_async(history.save_interview)(session_id, session, "")
+            raise
+        final_feedback = response.text.strip()
+
+        payload = interview.summary_payload(session, final_feedback)
+        await replies.aset(reply_key, payload)
+        await sync_to_async(history.save_interview)(session_id, session, final_feedback)
+        await session_store.asave(session_id, interview.ended_session(session))
+
+        return JsonResponse(payload)
+
+    except Exception as e:
+        logger.error(f"Error in end_interview: {str(e)}", exc_info=True)
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@require_GET
+async def end_status(request, job_id):
+    """Poll a queued end-of-interview evaluation"""
+    job = await jobs.aget(job_id)
+    if job is None:
+        return JsonResponse({"error": "Job not found"}, status=404)
+    return JsonResponse(jobs.public(job))
@@ -0,0 +1,89 @@
+"""
+In-memory audio ingestion.
+
+Uploads are collected straight from their chunks and decoded by piping them
+through ffmpeg's stdin/stdout, so answers never touch the disk.
+"""
+import io
+import wave
+import shutil
+import subprocess
+
+from . import metrics
+
+SAMPLE_RATE = 16000
+FFMPEG_BINARY = "ffmpeg"
+
+
+class AudioDecodeError(Exception):
+    """Raised when ffmpeg can't decode an upload"""
+
+
+def read_upload(upload):
+    """Collect an uploaded file's chunks into a single bytes object"""
+    return b"".join(upload.chunks())
+
+
+def _pcm_from_wav(audio_bytes):
+    """Return (pcm, sample_rate) for mono 16-bit WAV input, else None"""
+    if audio_bytes[:4] != b"RIFF" or audio_bytes[8:12] != b"WAVE":
+        return None
+    try:
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                return None
+            return wf.readframes(wf.getnframes()), wf.getframerate()
+    except (wave.Error, EOFError):
+        return None
+
+
+def decode_to_pcm(audio_bytes, sample_rate=SAMPLE_RATE):
+    """
+    Decode any container/codec ffmpeg understands to mono 16-bit PCM.
+
+    Returns (pcm_bytes, sample_rate). Mono 16-bit WAV is read directly
+    without spawning ffmpeg.
+    """
+    decoded = _pcm_from_wav(audio_bytes)
+    if decoded is not None:
+        observe_duration(len(decoded[0]), decoded[1])
+        return decoded
+
+    cmd = [
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+    try:
+        result = subprocess.run(cmd, input=audio_bytes, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise AudioDecodeError(e.stderr.decode(errors="replace").strip() or "ffmpeg failed") from e
+    observe_duration(len(result.stdout), sample_rate)
+    return result.stdout, sample_rate
+
+
+def ffmpeg_available():
+    """Whether the ffmpeg binary is on the PATH"""
+    return shutil.which(FFMPEG_BINARY) is not None
+
+
+def observe_duration(pcm_length, sample_rate):
+    """Record the duration of ``pcm_length`` bytes of mono 16-bit PCM"""
+    metrics.AUDIO_SECONDS.observe(pcm_length / 2 / sample_rate)
+
+
+def start_pcm_decoder(sample_rate=SAMPLE_RATE):
+    """
+    Start a long-running ffmpeg that turns audio written to its stdin into
+    mono 16-bit PCM on its stdout, for decoding uploads chunk by chunk.
+    Probing is kept short so PCM comes out while chunks are still arriving.
+    """
+    cmd = [
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+        "-probesize", "32768", "-analyzeduration", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+    return subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
@@ -0,0 +1,163 @@
+"""
+Rolling conversation context for interviewer prompts.
+
+The last CONTEXT_RECENT_TURNS history entries are sent verbatim; older
+entries are folded into a running summary stored on the session
+(``summary`` / ``summarized_turns``). Folding is incremental: only the turns
+that just left the window are merged into the existing summary, so prompt
+size stays flat no matter how long the interview runs. The final evaluation
+still reads the whole conversation (``full_context``).
+"""
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+from . import interview, llm, metrics, prompts
+from .sessions import get_session_store, SessionLockTimeout
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="context")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+# gemini-2.5-flash counts thinking against max_output_tokens and this SDK
+# can't switch thinking off, so the cap leaves room for it; the summary's
+# length is held to CONTEXT_SUMMARY_TOKENS by the prompt
+FOLD_THINKING_TOKENS = 2048
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def build_context(session):
+    """Conversation context for a prompt: running summary + recent turns"""
+    history = session["conversation_history"]
+    recent = history[session.get("summarized_turns", 0):]
+    summary = session.get("summary")
+    if not summary:
+        return interview.conversation_context(recent)
+    return f"Summary of the earlier conversation:\n{summary}\n\nMost recent turns:\n" + interview.conversation_context(recent)
+
+
+def full_context(session):
+    """The whole conversation, for the end-of-interview summary"""
+    return interview.conversation_context(session["conversation_history"])
+
+
+def answer_prompt(session, candidates=None):
+    """Interviewer prompt for the answer just recorded on the session"""
+    if candidates:
+        return interview.interviewer_choice_prompt(
+            session["topic"], build_context(session), session["question_count"], candidates
+        )
+    return interview.interviewer_prompt(session["topic"], build_context(session), session["question_count"])
+
+
+def needs_compaction(session):
+    return len(session["conversation_history"]) - session.get("summarized_turns", 0) > settings.CONTEXT_RECENT_TURNS
+
+
+def fold(session):
+    """
+    (summary, summarized_turns) with the turns that fell out of the recent
+    window folded in, None when there is nothing to fold. The session is
+    not modified.
+    """
+    if not needs_compaction(session):
+        return None
+    history = session["conversation_history"]
+    start = session.get("summarized_turns", 0)
+    cutoff = len(history) - settings.CONTEXT_RECENT_TURNS
+    evicted = history[start:cutoff]
+    summary = session.get("summary", "")
+
+    if settings.CONTEXT_SUMMARY_MODE == "model":
+        try:
+            summary = _fold_with_model(session["topic"], summary, evicted)
+            method = "model"
+        except Exception as e:
+            logger.warning(f"Model summary failed, using extractive summary: {e}")
+            summary = _fold_extractive(summary, evicted)
+            method = "fallback"
+    else:
+        summary = _fold_extractive(summary, evicted)
+        method = "extractive"
+    metrics.CONTEXT_FOLDS.inc(method=method)
+    return summary, cutoff
+
+
+def schedule_compaction(session_id, session):
+    """Compact the session in the background once the reply has been sent"""
+    if needs_compaction(session):
+        _executor.submit(_compact_stored_session, session_id)
+
+
+def _compact_stored_session(session_id):
+    store = get_session_store()
+    try:
+        # Fold a snapshot without the session lock: a model fold takes as
+        # long as an answer, and the next answer shouldn't wait for it
+        session = store.get(session_id)
+        if not interview.is_active(session):
+            return
+        nonce, start = session.get("nonce"), session.get("summarized_turns", 0)
+        folded = fold(session)
+        if folded is None:
+            return
+        with store.lock(session_id):
+            session = store.get(session_id)
+            # Compare-and-set: history only grows, so the fold still applies
+            # unless the interview ended or another fold got there first
+            if (interview.is_active(session) and session.get("nonce") == nonce
+                    and session.get("summarized_turns", 0) == start):
+                session["summary"], session["summarized_turns"] = folded
+                store.save(session_id, session)
+    except SessionLockTimeout:
+        logger.info(f"Skipped context compaction for busy session {session_id}")
+    except Exception as e:
+        logger.error(f"Context compaction failed for {session_id}: {e}", exc_info=True)
+    finally:
+        # This thread isn't a request, so Django won't close its DB connection
+        connections.close_all()
+
+
+def _fold_with_model(topic, summary, turns):
+    budget = settings.CONTEXT_SUMMARY_TOKENS
+    prompt = prompts.render(
+        "fold", topic,
+        summary=summary or "(empty)", turns=interview.conversation_context(turns), words=budget * 3 // 4,
+    )
+    response = llm.generate(prompt, generation_config={"max_output_tokens": budget + FOLD_THINKING_TOKENS})
+    candidates = getattr(response, "candidates", None) or [None]
+    finish = getattr(candidates[0], "finish_reason", None)
+    if getattr(finish, "name", finish) == "MAX_TOKENS":
+        raise ValueError("summary was cut off at the output token limit")
+    text = response.text.strip()  # raises ValueError when the reply has no text
+    if not text:
+        raise ValueError("empty summary")
+    return text
+
+
+def _first_sentence(text, max_words=25):
+    sentence = _SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+    words = sentence.split()
+    return " ".join(words[:max_words]) + (" ..." if len(words) > max_words else "")
+
+
+def _fold_extractive(summary, turns):
+    """Cheap fallback: one line per turn, oldest lines dropped to fit the budget"""
+    lines = summary.split("\n") if summary else []
+    for entry in turns:
+        role = "Interviewer" if entry["role"] == "interviewer" else "Candidate"
+        # For interviewer turns the question matters more than the feedback
+        content = entry["content"].rpartition("Next question:")[2]
+        lines.append(f"{role}: {_first_sentence(content)}")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > settings.CONTEXT_SUMMARY_TOKENS:
+        lines.pop(0)
+    return "\n".join(lines)
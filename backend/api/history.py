@@ -0,0 +1,189 @@
+"""
+Server-side interview history.
+
+Interviews are written as they happen: ``start_interview`` adds the row when
+the first question is served, ``record_turn`` appends each answered turn,
+and ``save_interview`` stores the final evaluation (empty when the summary
+failed) along with any turns that are still missing. Until an interview
+ends, ``ended_at`` is the time of its last turn, so abandoned interviews
+show up with what was answered. The history endpoints read them back per
+client:
+
+    GET /api/history/?client_id=<id>[&topic=<topic>][&limit=20][&cursor=<c>]
+    GET /api/history/<id>/?client_id=<id>
+
+The list is keyset-paginated on (started_at, id), newest first, and served
+from the (client_id[, topic], -started_at, -id) indexes, so a page costs the
+same whether a client has ten interviews or ten thousand; ``next_cursor``
+is null on the last page.
+"""
+import json
+import base64
+import logging
+import datetime
+
+from django.db import transaction
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from .models import InterviewSession, Turn, Evaluation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def _timestamp(seconds):
+    return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+
+
+def _record(session_id, session, ended_at):
+    started_at = _timestamp(session["started_at"]) if session.get("started_at") else ended_at
+    record, _ = InterviewSession.objects.update_or_create(
+        session_id=session_id,
+        defaults={"questions_asked": session["question_count"], "ended_at": ended_at},
+        create_defaults={
+            "client_id": session.get("client_id", ""),
+            "topic": session["topic"],
+            "questions_asked": session["question_count"],
+            "started_at": started_at,
+            "ended_at": ended_at,
+        },
+    )
+    return record
+
+
+def _turn(record, number, turn):
+    return Turn(session=record, number=number, question=turn["question"],
+                transcript=turn["transcript"], feedback=turn["feedback"] or "")
+
+
+def start_interview(session_id, session):
+    """Add the row for an interview that just started; failures are logged, never raised"""
+    try:
+        return _record(session_id, session, timezone.now())
+    except Exception as e:
+        logger.error(f"Could not save history for session {session_id}: {e}", exc_info=True)
+        return None
+
+
+def record_turn(session_id, session):
+    """Append the turn just recorded on the session; failures are logged, never raised"""
+    turns = session.get("turns", [])
+    if not turns:
+        return None
+    try:
+        now = timezone.now()
+        # One transaction: bump the row, insert the turn
+        with transaction.atomic():
+            updated = InterviewSession.objects.filter(session_id=session_id).update(
+                questions_asked=session["question_count"], ended_at=now,
+            )
+            if updated:
+                record = InterviewSession.objects.only("id").get(session_id=session_id)
+            else:
+                record = _record(session_id, session, now)
+            Turn.objects.bulk_create([_turn(record, len(turns), turns[-1])], ignore_conflicts=True)
+        return record
+    except Exception as e:
+        logger.error(f"Could not save turn for session {session_id}: {e}", exc_info=True)
+        return None
+
+
+def save_interview(session_id, session, final_feedback):
+    """
+    Store the end of an interview: turns missed along the way and the final
+    evaluation (empty when the summary failed); failures are logged, never raised
+    """
+    try:
+        with transaction.atomic():
+            record = _record(session_id, session, timezone.now())
+            Turn.objects.bulk_create([
+                _turn(record, number, turn)
+                for number, turn in enumerate(session.get("turns", []), start=1)
+            ], ignore_conflicts=True)
+            Evaluation.objects.update_or_create(session=record, defaults={"final_feedback": final_feedback})
+        return record
+    except Exception as e:
+        logger.error(f"Could not save history for session {session_id}: {e}", exc_info=True)
+        return None
+
+
+def _encode_cursor(record):
+    raw = json.dumps([record.started_at.isoformat(), record.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    started_at, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.datetime.fromisoformat(started_at), int(record_id)
+
+
+def _summary(record):
+    return {
+        "id": record.id,
+        "session_id": record.session_id,
+        "topic": record.topic,
+        "questions_asked": record.questions_asked,
+        "started_at": record.started_at.isoformat(),
+        "ended_at": record.ended_at.isoformat(),
+        "final_feedback": record.evaluation.final_feedback if hasattr(record, "evaluation") else None,
+    }
+
+
+@require_GET
+def history_list(request):
+    """One page of a client's interviews, newest first"""
+    client_id = request.GET.get("client_id")
+    if not client_id:
+        return JsonResponse({"error": "Missing client_id"}, status=400)
+
+    try:
+        limit = min(max(int(request.GET.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+
+    records = InterviewSession.objects.filter(client_id=client_id).select_related("evaluation")
+    if request.GET.get("topic"):
+        records = records.filter(topic=request.GET["topic"])
+
+    cursor = request.GET.get("cursor")
+    if cursor:
+        try:
+            started_at, record_id = _decode_cursor(cursor)
+        except (ValueError, TypeError):
+            return JsonResponse({"error": "Invalid cursor"}, status=400)
+        records = records.filter(Q(started_at__lt=started_at) | Q(started_at=started_at, id__lt=record_id))
+
+    # One extra row tells us whether there is a next page
+    page = list(records.order_by("-started_at", "-id")[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    return JsonResponse({
+        "results": [_summary(record) for record in page],
+        "next_cursor": _encode_cursor(page[-1]) if has_more else None,
+    })
+
+
+@require_GET
+def history_detail(request, record_id):
+    """An interview with all of its recorded turns"""
+    client_id = request.GET.get("client_id")
+    if not client_id:
+        return JsonResponse({"error": "Missing client_id"}, status=400)
+
+    record = (
+        InterviewSession.objects.filter(id=record_id, client_id=client_id)
+        .select_related("evaluation").prefetch_related("turns").first()
+    )
+    if record is None:
+        return JsonResponse({"error": "Interview not found"}, status=404)
+
+    return JsonResponse(dict(_summary(record), turns=[
+        {"number": turn.number, "question": turn.question, "transcript": turn.transcript, "feedback": turn.feedback}
+        for turn in record.turns.all()
+    ]))
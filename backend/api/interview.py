@@ -0,0 +1,279 @@
+"""
+Interview logic shared by the sync (WSGI) and async (ASGI) views:
+prompts, response parsing and session bookkeeping.
+"""
+import json
+import time
+import uuid
+
+from . import parsing, prompts
+
+MODEL_NAME = "gemini-2.5-flash"
+
+TRANSCRIBE_PROMPT = "Transcribe this audio exactly as spoken. Return only the spoken words, nothing else."
+
+DEFAULT_GREETING = "Hi, I am your interviewer, let's start."
+DEFAULT_FEEDBACK = "Thank you for your answer. Let me provide some feedback."
+DEFAULT_NEXT_QUESTION = "Let's move on to the next question."
+
+
+# ---------------------------
+# Prompts
+# ---------------------------
+
+# The text lives in api/prompts.py: shared rules in the system instruction,
+# then topic, conversation and task, so calls share a cacheable prefix
+
+def opening_prompt(topic):
+    return prompts.render("opening", topic)
+
+
+def interviewer_prompt(topic, conversation_context, current_question_num):
+    return prompts.render("answer", topic, conversation_context, number=current_question_num)
+
+
+def interviewer_choice_prompt(topic, conversation_context, current_question_num, candidates):
+    """Like interviewer_prompt, but the next question is picked from prefetched candidates"""
+    options = "\n".join(f"{i}. {question}" for i, question in enumerate(candidates, 1))
+    return prompts.render("answer_choice", topic, conversation_context, number=current_question_num, options=options)
+
+
+def follow_up_prompt(topic, conversation_context, count):
+    """Ask for likely next questions without waiting for the candidate's answer"""
+    return prompts.render("follow_up", topic, conversation_context, count=count)
+
+
+def feedback_prompt(topic, conversation_context, current_question_num):
+    """Feedback only; the next question is generated separately"""
+    return prompts.render("feedback", topic, conversation_context, number=current_question_num)
+
+
+def audio_answer_contents(topic, conversation_context, current_question_num, audio_bytes, mime_type):
+    """Transcribe the attached answer audio and respond to it in one call"""
+    prefix, task = prompts.parts("audio_answer", topic, conversation_context, number=current_question_num)
+    # The audio goes after the stable prefix so it doesn't break it
+    return [prefix, {"mime_type": mime_type, "data": audio_bytes}, task]
+
+
+def summary_prompt(topic, conversation_context):
+    return prompts.render("summary", topic, conversation_context)
+
+
+def conversation_context(history):
+    """Render the conversation history as an Interviewer/Candidate transcript"""
+    lines = []
+    for entry in history:
+        role = "Interviewer" if entry["role"] == "interviewer" else "Candidate"
+        lines.append(f"{role}: {entry['content']}\n")
+    return "".join(lines)
+
+
+# ---------------------------
+# Response parsing
+# ---------------------------
+
+def parse_opening(ai_response):
+    """Split an opening reply into (greeting, question)"""
+    fields = parsing.parse("opening", ai_response)
+    # Fallback if parsing fails
+    return fields["greeting"] or DEFAULT_GREETING, fields["question"] or ai_response
+
+
+def parse_feedback(ai_response):
+    """Split an interviewer reply into (feedback, next_question)"""
+    fields = parsing.parse("answer", ai_response)
+    return fields["feedback"] or DEFAULT_FEEDBACK, fields["next_question"] or DEFAULT_NEXT_QUESTION
+
+
+def parse_audio_answer(ai_response):
+    """Split a multimodal reply into (transcript, feedback, next_question)"""
+    fields = parsing.parse("audio_answer", ai_response)
+    return (
+        fields["transcript"],
+        fields["feedback"] or DEFAULT_FEEDBACK,
+        fields["next_question"] or DEFAULT_NEXT_QUESTION,
+    )
+
+
+def parse_feedback_only(ai_response):
+    return parsing.parse("feedback", ai_response)["feedback"] or DEFAULT_FEEDBACK
+
+
+def parse_questions(ai_response):
+    """Collect the QUESTION: lines of a reply"""
+    return parsing.parse_questions(ai_response)
+
+
+class FeedbackStreamParser:
+    """
+    Incremental parser for a streamed FEEDBACK:/NEXT_QUESTION: reply.
+
+    ``feed`` takes raw text chunks and returns (section, text) deltas as soon
+    as they can be attributed to a section. Markers are found with the same
+    pattern as the final parse (api/parsing.py), so ``**FEEDBACK:**`` works
+    too. An unfinished last line is held back while it could still become a
+    marker, and so are asterisks and whitespace at the end of the text so
+    far, which may turn out to close the section.
+    """
+
+    FIELDS = parsing.SCHEMAS["answer"]
+
+    def __init__(self):
+        self.section = None
+        self._text = ""
+        self._pos = 0  # everything before this has been attributed
+        self._edge = ""  # held-back trailing asterisks and whitespace
+        self._section_start = False
+
+    def feed(self, chunk):
+        self._text += chunk
+        events = []
+        self._scan(events, final=False)
+        return events
+
+    def finish(self):
+        """Flush the held-back tail and return the final (feedback, next_question)"""
+        events = []
+        self._scan(events, final=True)
+        return events, parse_feedback(self._text.strip())
+
+    def _scan(self, events, final):
+        pattern = parsing.marker_pattern(self.FIELDS)
+        end = len(self._text)
+        while True:
+            match = pattern.search(self._text, self._pos)
+            if match is None:
+                break
+            if match.end() == len(self._text) and not final:
+                # More asterisks or spaces of this marker may still arrive
+                end = match.start()
+                break
+            self._emit(self._text[self._pos:match.start()], events)
+            self.section = match.group(1).lower()
+            self._section_start = True
+            self._edge = ""
+            self._pos = match.end()
+        if not final and end == len(self._text):
+            newline = self._text.rfind("\n", self._pos)
+            if newline >= 0:
+                line_start = newline + 1
+            elif self._pos == 0 or self._text[self._pos - 1] == "\n":
+                line_start = self._pos
+            else:
+                line_start = None  # mid-line, right after a marker
+            if line_start is not None and parsing.could_start_marker(self._text[line_start:], self.FIELDS):
+                end = line_start
+        self._emit(self._text[self._pos:end], events)
+        self._pos = end
+
+    def _emit(self, text, events):
+        if self._section_start:
+            # Drop the whitespace and emphasis between a marker and its text
+            text = text.lstrip(" \t\r\n*")
+            self._section_start = not text
+        if not text or not self.section:
+            return
+        text = self._edge + text
+        body = text.rstrip(" \t\r\n*")
+        self._edge = text[len(body):]
+        if body:
+            events.append((self.section, body))
+
+
+# ---------------------------
+# Session bookkeeping
+# ---------------------------
+
+def new_session(topic, greeting, question, client_id=""):
+    return {
+        "topic": topic,
+        "question_count": 1,
+        "conversation_history": [
+            {"role": "interviewer", "content": f"{greeting} {question}"}
+        ],
+        # Kept verbatim for the persisted history (api/history.py)
+        "question": question,
+        "turns": [],
+        "client_id": client_id,
+        "started_at": time.time(),
+        # Identifies this interview in replay and job keys (api/replay.py)
+        "nonce": uuid.uuid4().hex,
+    }
+
+
+def ended_session(session):
+    """
+    What is kept of a session once its summary is stored: enough for a
+    retried end/ call to find that summary, nothing an answer can use
+    """
+    return {"nonce": session.get("nonce", ""), "ended": True}
+
+
+def is_active(session):
+    """True for a session that can still take answers"""
+    return bool(session) and not session.get("ended")
+
+
+def is_usable_transcript(transcript):
+    return bool(transcript) and len(transcript) >= 3
+
+
+def record_answer(session, transcript):
+    session["conversation_history"].append({
+        "role": "candidate",
+        "content": transcript
+    })
+
+
+def record_feedback(session, feedback, next_question):
+    history = session["conversation_history"]
+    transcript = history[-1]["content"] if history and history[-1]["role"] == "candidate" else ""
+    session.setdefault("turns", []).append({
+        "question": session.get("question", ""),
+        "transcript": transcript,
+        "feedback": feedback,
+    })
+    session["question"] = next_question
+    session["question_count"] += 1
+    session["conversation_history"].append({
+        "role": "interviewer",
+        "content": f"Feedback: {feedback} Next question: {next_question}"
+    })
+
+
+def current_question_id(session_id, session):
+    return f"{session_id}_q{session['question_count']}"
+
+
+def opening_payload(session_id, greeting, question):
+    return {
+        "session_id": session_id,
+        "question_id": f"{session_id}_q1",
+        "greeting": greeting,
+        "question": question,
+        "question_number": 1
+    }
+
+
+def answer_payload(session_id, session, transcript, feedback, next_question):
+    return {
+        "transcript": transcript,
+        "feedback": feedback,
+        "next_question": next_question,
+        "question_id": current_question_id(session_id, session),
+        "session_id": session_id,
+        "question_number": session["question_count"]
+    }
+
+
+def summary_payload(session, final_feedback):
+    return {
+        "final_feedback": final_feedback,
+        "questions_asked": session["question_count"],
+        "topic": session["topic"]
+    }
+
+
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
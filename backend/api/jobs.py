@@ -0,0 +1,173 @@
+"""
+Background end-of-interview evaluations.
+
+With SUMMARY_JOBS=True, end_interview queues the final summary on a small
+per-worker thread pool and answers 202 with a job ID right away; clients
+poll end/<job_id>/ for the result. The web worker is free immediately, a
+proxy timeout can no longer lose the evaluation, and SUMMARY_WORKERS caps
+concurrent summary generations separately from answer traffic.
+
+Job state lives in the shared cache (SUMMARY_JOB_CACHE_ALIAS), so any
+worker can answer a poll. Each session maps to one job, so a retried
+end/ call gets the job that is already running. Job keys include the
+interview's nonce, so a job never outlives or crosses into another
+interview that reuses the session ID. The session is replaced by its ended
+marker only once the summary is stored (as a replay, see api/replay.py).
+
+Jobs run in the worker that queued them: if that process dies, the job
+reports "failed" after SUMMARY_JOB_TIMEOUT seconds, and calling end/ again
+starts a new one.
+"""
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from . import interview, context, llm, replay, metrics, history
+from .sessions import get_session_store
+from .replay import get_replay_cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "interview:job:"
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class JobStats:
+    """Per-worker job counters"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.running = 0
+        self.done = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "queued": self.submitted - self.running - self.done - self.failed,
+                "running": self.running,
+                "done": self.done,
+                "failed": self.failed,
+            }
+
+
+stats = JobStats()
+
+
+def get_stats():
+    return stats.as_dict()
+
+
+def _cache():
+    return caches[settings.SUMMARY_JOB_CACHE_ALIAS]
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.SUMMARY_WORKERS, thread_name_prefix="summary")
+        return _executor
+
+
+def _session_key(session_id, nonce):
+    return f"{KEY_PREFIX}session:{session_id}:{nonce}"
+
+
+def _save(job):
+    job["updated"] = time.time()
+    _cache().set(KEY_PREFIX + job["job_id"], job, timeout=settings.SUMMARY_JOB_TTL)
+
+
+def public(job):
+    """The job as returned to clients"""
+    return {key: value for key, value in job.items() if key not in ("session_id", "nonce", "updated")}
+
+
+def submit(session_id, nonce):
+    """Queue the summary for the interview ``session_id``/``nonce`` (or return its existing job)"""
+    job_id = uuid.uuid4().hex
+    key = _session_key(session_id, nonce)
+    if not _cache().add(key, job_id, timeout=settings.SUMMARY_JOB_TTL):
+        existing = get(_cache().get(key) or "")
+        if existing is not None and existing["status"] != FAILED:
+            return existing
+        _cache().set(key, job_id, timeout=settings.SUMMARY_JOB_TTL)
+
+    job = {"job_id": job_id, "session_id": session_id, "nonce": nonce, "status": QUEUED}
+    _save(job)
+    stats.add(submitted=1)
+    _get_executor().submit(_run, job)
+    return job
+
+
+def get(job_id):
+    """Current state of a job, None if unknown or expired"""
+    job = _cache().get(KEY_PREFIX + job_id)
+    if job is None:
+        return None
+    if job["status"] in (QUEUED, RUNNING) and time.time() - job["updated"] > settings.SUMMARY_JOB_TIMEOUT:
+        # The worker that owned it went away
+        job = dict(job, status=FAILED, error="Evaluation was interrupted, please end the interview again")
+    return job
+
+
+def _run(job):
+    session_id = job["session_id"]
+    stats.add(running=1)
+    try:
+        _save(dict(job, status=RUNNING))
+        session_store = get_session_store()
+        session = session_store.get(session_id)
+        if not interview.is_active(session) or session.get("nonce", "") != job["nonce"]:
+            raise LookupError("Session not found")
+
+        prompt = interview.summary_prompt(session["topic"], context.full_context(session))
+        try:
+            with metrics.stage("end", "generation"):
+                response = llm.generate(prompt)
+        except Exception:
+            # Keep the transcript; a retried end/ fills in the evaluation
+            history.save_interview(session_id, session, "")
+            raise
+        final_feedback = response.text.strip()
+        payload = interview.summary_payload(session, final_feedback)
+
+        # Store the summary before the session goes away
+        get_replay_cache().set(replay.end_key(session_id, job["nonce"]), payload)
+        history.save_interview(session_id, session, final_feedback)
+        _save(dict(job, status=DONE, result=payload))
+        session_store.save(session_id, interview.ended_session(session))
+        stats.add(running=-1, done=1)
+    except Exception as e:
+        logger.error(f"Summary job {job['job_id']} failed: {e}", exc_info=not isinstance(e, LookupError))
+        _save(dict(job, status=FAILED, error=str(e)))
+        stats.add(running=-1, failed=1)
+    finally:
+        connections.close_all()
+
+
+async def asubmit(session_id, nonce):
+    return await sync_to_async(submit)(session_id, nonce)
+
+
+async def aget(job_id):
+    return await sync_to_async(get)(job_id)
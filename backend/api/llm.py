@@ -0,0 +1,344 @@
+"""
+Shared Gemini client.
+
+All model calls go through this module:
+
+- ``get_model()`` caches one GenerativeModel per configuration (or the
+  local stand-in from api/mock_llm.py with LLM_BACKEND=mock). The
+  underlying google client (and its pooled, kept-alive connection) is
+  configured once per worker and shared by every model.
+- Each attempt gets a per-call timeout (LLM_TIMEOUT) and the whole call an
+  overall deadline (LLM_DEADLINE). 429 and 5xx responses, timeouts and
+  connection errors are retried with jittered exponential backoff.
+- A per-worker limiter caps outstanding upstream calls (LLM_MAX_CONCURRENCY).
+  Callers wait up to LLM_QUEUE_TIMEOUT for a slot, then get LLMBusy.
+
+``http_session()`` is a pooled requests.Session for plain HTTP endpoints and
+``call()`` wraps any such request in the same limiter and retry policy.
+
+The google SDK (most of a worker's import time) and requests are imported
+on first use, not when this module loads; ``warm_up()`` (api/startup.py)
+does it ahead of the first request.
+"""
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+from django.conf import settings
+
+from . import interview, metrics, prompts
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_CAP = 8.0
+
+
+class LLMBusy(Exception):
+    """Raised when no upstream slot frees up within LLM_QUEUE_TIMEOUT"""
+
+
+class ConcurrencyLimiter:
+    """Bounded number of in-flight upstream calls, usable from threads and coroutines"""
+
+    def __init__(self, limit, wait):
+        self.limit = limit
+        self.wait = wait
+        self.in_flight = 0
+        self.rejected = 0
+        self._sem = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+
+    def _entered(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def _left(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._sem.release()
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+        raise LLMBusy(f"All {self.limit} upstream slots busy for {self.wait}s")
+
+    @contextmanager
+    def slot(self):
+        if not self._sem.acquire(timeout=self.wait):
+            self._reject()
+        self._entered()
+        try:
+            yield
+        finally:
+            self._left()
+
+    @asynccontextmanager
+    async def aslot(self):
+        # Poll with backoff so a full limiter never blocks the event loop
+        deadline = time.monotonic() + self.wait
+        delay = 0.005
+        while not self._sem.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                self._reject()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        self._entered()
+        try:
+            yield
+        finally:
+            self._left()
+
+    def stats(self):
+        with self._lock:
+            return {"limit": self.limit, "in_flight": self.in_flight, "rejected": self.rejected}
+
+
+_configured = False
+_models = {}
+_lock = threading.Lock()
+_limiter = None
+_http = None
+retries = 0
+
+
+def _configure():
+    global _configured, _limiter
+    if not _configured:
+        if settings.LLM_BACKEND != "mock":
+            import google.generativeai as genai
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+        _limiter = ConcurrencyLimiter(settings.LLM_MAX_CONCURRENCY, settings.LLM_QUEUE_TIMEOUT)
+        _configured = True
+
+
+def get_limiter():
+    with _lock:
+        _configure()
+    return _limiter
+
+
+def _model_class():
+    if settings.LLM_BACKEND == "mock":
+        from .mock_llm import MockModel
+        return MockModel
+    import google.generativeai as genai
+    return genai.GenerativeModel
+
+
+def get_model(model_name=interview.MODEL_NAME, **options):
+    """
+    Return the cached GenerativeModel for this model name and options.
+
+    Models get the interviewer system instruction from api/prompts.py unless
+    the caller passes its own (``system_instruction=None`` for none).
+    """
+    options.setdefault("system_instruction", prompts.SYSTEM_INSTRUCTION)
+    key = (model_name, json.dumps(options, sort_keys=True, default=str))
+    with _lock:
+        _configure()
+        model = _models.get(key)
+        if model is None:
+            model = _models[key] = _model_class()(model_name, **options)
+    return model
+
+
+def warm_up():
+    """Import and configure the SDK and build the default model now"""
+    get_model()
+
+
+def http_session():
+    """Pooled, kept-alive requests.Session shared by the worker"""
+    global _http
+    with _lock:
+        if _http is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            _http = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.LLM_MAX_CONCURRENCY)
+            _http.mount("https://", adapter)
+            _http.mount("http://", adapter)
+        return _http
+
+
+def _status(error):
+    code = getattr(error, "code", None)  # google.api_core errors carry the HTTP status
+    if isinstance(code, int):
+        return code
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _retryable(error):
+    status = _status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Timeouts and dropped connections (requests' errors are OSErrors too)
+    return isinstance(error, (OSError, asyncio.TimeoutError))
+
+
+def _backoff(attempt):
+    """Full jitter: uniform in [0, min(cap, base * 2^attempt)]"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def _attempts():
+    """Yield (attempt, timeout, deadline) until retries or the deadline run out"""
+    deadline = time.monotonic() + settings.LLM_DEADLINE
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        yield attempt, min(settings.LLM_TIMEOUT, remaining), deadline
+
+
+def _should_retry(error, attempt, deadline, delay):
+    global retries
+    if not _retryable(error) or attempt >= settings.LLM_MAX_RETRIES or time.monotonic() + delay >= deadline:
+        return False
+    with _lock:
+        retries += 1
+    logger.warning(f"Upstream call failed ({error}), retry {attempt + 1} in {delay:.2f}s")
+    return True
+
+
+def call(fn):
+    """Run ``fn(timeout)`` under the limiter, retrying transient failures"""
+    limiter = get_limiter()
+    for attempt, timeout, deadline in _attempts():
+        try:
+            with limiter.slot():
+                return fn(timeout)
+        except Exception as e:
+            delay = _backoff(attempt)
+            if not _should_retry(e, attempt, deadline, delay):
+                raise
+            time.sleep(delay)
+    raise TimeoutError(f"Upstream call exceeded its {settings.LLM_DEADLINE}s deadline")
+
+
+async def acall(fn):
+    """Async call(): ``fn(timeout)`` returns an awaitable"""
+    limiter = get_limiter()
+    for attempt, timeout, deadline in _attempts():
+        try:
+            async with limiter.aslot():
+                return await fn(timeout)
+        except Exception as e:
+            delay = _backoff(attempt)
+            if not _should_retry(e, attempt, deadline, delay):
+                raise
+            await asyncio.sleep(delay)
+    raise TimeoutError(f"Upstream call exceeded its {settings.LLM_DEADLINE}s deadline")
+
+
+@contextmanager
+def _measured():
+    """Record latency, outcome and token usage of one logical call"""
+    outcome = {"response": None}
+    start = time.perf_counter()
+    try:
+        yield outcome
+    except Exception:
+        metrics.record_llm_call(time.perf_counter() - start, ok=False)
+        raise
+    metrics.record_llm_call(time.perf_counter() - start, outcome["response"])
+
+
+def generate(contents, generation_config=None, **options):
+    """generate_content() on the shared model with timeout, retries and the limiter"""
+    model = get_model(**options)
+    with _measured() as outcome:
+        outcome["response"] = call(lambda timeout: model.generate_content(
+            contents, generation_config=generation_config, request_options={"timeout": timeout},
+        ))
+    return outcome["response"]
+
+
+async def agenerate(contents, generation_config=None, **options):
+    model = get_model(**options)
+    with _measured() as outcome:
+        outcome["response"] = await acall(lambda timeout: model.generate_content_async(
+            contents, generation_config=generation_config, request_options={"timeout": timeout},
+        ))
+    return outcome["response"]
+
+
+def stream(contents, generation_config=None, **options):
+    """
+    Yield response chunks. Failures before the first chunk are retried; the
+    upstream slot is held until the stream is exhausted or closed.
+    """
+    model = get_model(**options)
+
+    def start(timeout):
+        chunks = iter(model.generate_content(
+            contents, generation_config=generation_config, request_options={"timeout": timeout}, stream=True,
+        ))
+        return next(chunks, None), chunks
+
+    limiter = get_limiter()
+    with _measured() as outcome:
+        for attempt, timeout, deadline in _attempts():
+            with limiter.slot():
+                try:
+                    first, chunks = start(timeout)
+                except Exception as e:
+                    delay = _backoff(attempt)
+                    if not _should_retry(e, attempt, deadline, delay):
+                        raise
+                else:
+                    if first is not None:
+                        yield first
+                        outcome["response"] = first
+                    for chunk in chunks:
+                        yield chunk
+                        outcome["response"] = chunk  # usage arrives on the last chunk
+                    return
+            time.sleep(delay)
+        raise TimeoutError(f"Upstream call exceeded its {settings.LLM_DEADLINE}s deadline")
+
+
+async def astream(contents, generation_config=None, **options):
+    model = get_model(**options)
+
+    async def start(timeout):
+        response = await model.generate_content_async(
+            contents, generation_config=generation_config, request_options={"timeout": timeout}, stream=True,
+        )
+        chunks = response.__aiter__()
+        return await anext(chunks, None), chunks
+
+    limiter = get_limiter()
+    with _measured() as outcome:
+        for attempt, timeout, deadline in _attempts():
+            async with limiter.aslot():
+                try:
+                    first, chunks = await start(timeout)
+                except Exception as e:
+                    delay = _backoff(attempt)
+                    if not _should_retry(e, attempt, deadline, delay):
+                        raise
+                else:
+                    if first is not None:
+                        yield first
+                        outcome["response"] = first
+                    async for chunk in chunks:
+                        yield chunk
+                        outcome["response"] = chunk  # usage arrives on the last chunk
+                    return
+            await asyncio.sleep(delay)
+        raise TimeoutError(f"Upstream call exceeded its {settings.LLM_DEADLINE}s deadline")
+
+
+def stats():
+    # Reads the limiter without configuring it: a metrics scrape mustn't
+    # import the Gemini SDK
+    limiter = _limiter
+    current = limiter.stats() if limiter else {"limit": settings.LLM_MAX_CONCURRENCY, "in_flight": 0, "rejected": 0}
+    return dict(current, retries=retries, models=len(_models))
@@ -0,0 +1,133 @@
+"""
+Non-blocking, structured logging.
+
+- QueueLogHandler puts records on a bounded in-memory queue and returns; a
+  listener thread formats and writes them. When the queue is full, records
+  are dropped (and counted) instead of stalling requests.
+- JsonFormatter writes one JSON object per line, including ``extra`` fields
+  and the request trace ID; TextFormatter appends ``extra`` fields as
+  key=value pairs to the usual text line.
+- SampledDebugFilter keeps DEBUG records (transcripts, model excerpts) for
+  a fraction of requests only, chosen per trace ID so a sampled request
+  keeps all of its debug lines.
+
+Configured from settings.LOGGING (LOG_QUEUE, LOG_FORMAT, LOG_DEBUG_SAMPLE_RATE).
+"""
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import logging
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "trace_id"}
+
+_handlers = []
+
+
+class QueueLogHandler(QueueHandler):
+    """Enqueue records for a background listener that writes them to stderr"""
+
+    def __init__(self, queue_size=10000, stream=None):
+        super().__init__(queue.Queue(queue_size))
+        self.queue_size = queue_size
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.dropped = 0
+        self._start()
+        # Threads don't survive fork (e.g. gunicorn --preload): restart in the child
+        os.register_at_fork(after_in_child=self._restart)
+        atexit.register(self.close)
+        _handlers.append(self)
+
+    def _start(self):
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def _restart(self):
+        self.queue = queue.Queue(self.queue_size)
+        self._start()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Like QueueHandler.prepare, except the layout is left to the
+        # listener's formatter: merge the args and render the traceback now,
+        # so the queued record holds no references to live objects
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = (self.target.formatter or logging.Formatter()).formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.listener._thread is not None:
+            self.listener.stop()  # flushes what is still queued
+        super().close()
+
+
+def _extra(record):
+    return {key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRS}
+
+
+class TextFormatter(logging.Formatter):
+    """Plain text with ``extra`` fields appended"""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _extra(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "trace_id": getattr(record, "trace_id", "-"),
+            "message": record.getMessage(),
+        }
+        entry.update(_extra(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text  # rendered by QueueLogHandler.prepare
+        return json.dumps(entry, default=str)
+
+
+class SampledDebugFilter(logging.Filter):
+    """Pass every record above DEBUG and DEBUG records for ``rate`` of traces"""
+
+    def __init__(self, rate=0.0):
+        super().__init__()
+        self.threshold = int(rate * 0xFFFFFFFF)
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        trace = getattr(record, "trace_id", "-")
+        return zlib.crc32(trace.encode()) < self.threshold
+
+
+def dropped_records():
+    """Records dropped because a log queue was full, for api/metrics.py"""
+    return sum(handler.dropped for handler in _handlers)
@@ -0,0 +1,130 @@
+"""
+Bounded in-memory cache with LRU + TTL eviction and memory accounting.
+"""
+import time
+import pickle
+import threading
+from collections import OrderedDict
+
+
+def pickled_size(value):
+    """Approximate resident size of a value by its pickled length"""
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class BoundedTTLCache:
+    """
+    Thread-safe LRU cache bounded by entry count and by total bytes.
+
+    Entries expire ``ttl`` seconds after they were last written. Pinned keys
+    are never evicted (they may still be deleted explicitly), so the cache can
+    run over budget while every remaining entry is pinned.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=64 * 1024 * 1024, ttl=7200, sizeof=pickled_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._data = OrderedDict()  # key -> (value, size, expires_at)
+        self._pinned = {}
+        self._lock = threading.RLock()
+        self._next_sweep = time.monotonic() + min(ttl, 60)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.resident_bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[2] <= time.monotonic() and key not in self._pinned:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, time.monotonic() + self.ttl)
+            self.resident_bytes += size
+            self._evict()
+
+    def add(self, key, value):
+        """Set ``key`` only if it has no live entry; True when stored"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[2] > time.monotonic() or key in self._pinned):
+                return False
+            self.set(key, value)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def pin(self, key):
+        with self._lock:
+            self._pinned[key] = self._pinned.get(key, 0) + 1
+
+    def unpin(self, key):
+        with self._lock:
+            count = self._pinned.get(key, 0) - 1
+            if count > 0:
+                self._pinned[key] = count
+            else:
+                self._pinned.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "pinned": len(self._pinned),
+                "resident_bytes": self.resident_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self.resident_bytes -= size
+
+    def _over_budget(self):
+        return len(self._data) > self.max_entries or self.resident_bytes > self.max_bytes
+
+    def _evict(self):
+        # Full expiry sweeps are O(entries), so only run them periodically or
+        # when the cache is over budget; gets expire stale entries lazily.
+        now = time.monotonic()
+        if now >= self._next_sweep or self._over_budget():
+            self._next_sweep = now + min(self.ttl, 60)
+            expired = [k for k, (_, _, exp) in self._data.items() if exp <= now and k not in self._pinned]
+            for key in expired:
+                self._remove(key)
+                self.expirations += 1
+
+        # Walk from least to most recently used, skipping pinned entries
+        if self._over_budget():
+            for key in list(self._data):
+                if not self._over_budget():
+                    break
+                if key in self._pinned:
+                    continue
+                self._remove(key)
+                self.evictions += 1
@@ -0,0 +1,318 @@
+"""
+Re-transcribe and re-score an archive of recorded answers.
+
+    python manage.py batch_evaluate /data/answers --output results.jsonl
+    python manage.py batch_evaluate manifest.jsonl --output results.jsonl --batch-size 20
+    python manage.py batch_evaluate /data/answers --output transcripts.jsonl --no-evaluate
+
+The source is a directory (walked for audio files) or a manifest: JSON
+Lines with "path" and optional "topic" and "question", or one path per
+line. Recordings are transcribed with ``transcribe_with_vosk`` (api/utils.py)
+on a process pool with one process per core; each process loads the Vosk
+model once. Transcripts are then scored by Gemini in batches of
+--batch-size answers per call (grouped by topic) on a few threads, so
+evaluation overlaps transcription.
+
+The output file doubles as the checkpoint: every finished recording is
+appended as one JSON line and flushed, and a rerun skips the ones already
+recorded as "done" (the last line for an id wins). A worker process that
+crashes takes down the pool; it is rebuilt, the recordings that were in
+flight are rerun one at a time, and one that crashes a worker on its own
+--max-attempts times is recorded as failed.
+"""
+import os
+import sys
+import json
+import time
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand, CommandError
+
+AUDIO_EXTENSIONS = {".webm", ".wav", ".ogg", ".opus", ".mp3", ".m4a", ".flac"}
+MIME_TYPES = {".wav": "audio/wav", ".ogg": "audio/ogg", ".opus": "audio/ogg", ".mp3": "audio/mpeg",
+              ".m4a": "audio/mp4", ".flac": "audio/flac"}
+
+
+# --- worker processes ----------------------------------------------------------
+
+def _init_worker(engine):
+    import django
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mockmate.settings")
+    django.setup()
+    if engine == "vosk":
+        from api import utils
+        utils._load_model()
+
+
+def transcribe(path, engine):
+    """(transcript, seconds) for one recording, run in a pool process"""
+    start = time.perf_counter()
+    if engine == "vosk":
+        from api import utils
+        transcript = utils.transcribe_with_vosk(path)
+    else:
+        from api.transcription import get_transcriber
+        with open(path, "rb") as f:
+            audio_bytes = f.read()
+        mime_type = MIME_TYPES.get(os.path.splitext(path)[1].lower(), "audio/webm")
+        transcript = get_transcriber().transcribe(audio_bytes, mime_type)
+    return transcript.strip(), time.perf_counter() - start
+
+
+# --- inputs and checkpoint -----------------------------------------------------
+
+def read_items(source, topic):
+    """Recordings to process as dicts with id, path, topic and question"""
+    items = []
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    items.append({"id": os.path.relpath(path, source), "path": path})
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source) as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    entry = json.loads(line) if line.startswith("{") else {"path": line}
+                except ValueError:
+                    raise CommandError(f"{source}:{number}: not valid JSON")
+                if not entry.get("path"):
+                    raise CommandError(f"{source}:{number}: no path")
+                entry["id"] = entry.get("id") or entry["path"]
+                entry["path"] = os.path.join(base, entry["path"])
+                items.append(entry)
+    for item in items:
+        item.setdefault("topic", topic)
+        item.setdefault("question", "")
+    return items
+
+
+def read_checkpoint(output):
+    """IDs already recorded as done; a torn last line from a crash is cut off"""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    for line in data.splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("status") == "done":
+            done.add(record["id"])
+        else:
+            done.discard(record.get("id"))
+    return done
+
+
+class ResultWriter:
+    """Appends one JSON line per finished recording, flushed and fsynced"""
+
+    def __init__(self, path):
+        self.file = open(path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.counts = defaultdict(int)
+
+    def write(self, record):
+        with self.lock:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.counts[record["status"]] += 1
+
+    def close(self):
+        self.file.close()
+
+
+# --- evaluation ----------------------------------------------------------------
+
+def evaluate_batch(topic, records):
+    """Score one topic's transcripts in a single model call; fills score and feedback in place"""
+    from api import llm, parsing, prompts
+
+    answers = "\n\n".join(
+        f"ANSWER {number}\nQuestion: {record['question'] or '(not recorded)'}\nAnswer: {record['transcript']}"
+        for number, record in enumerate(records, 1)
+    )
+    response = llm.generate(prompts.render("batch_evaluation", topic, answers=answers), parsing.evaluation_config())
+    results = parsing.parse_evaluations(response.text, len(records))
+    for number, record in enumerate(records, 1):
+        if number in results:
+            record["score"], record["feedback"] = results[number]
+        else:
+            record["status"], record["error"] = "failed", "missing from the evaluation reply"
+
+
+class Command(BaseCommand):
+    help = "Transcribe and score a directory or manifest of recorded answers on a process pool, writing JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Directory of recordings, or a manifest (JSON Lines or one path per line)")
+        parser.add_argument("--output", required=True, help="JSON Lines results file; also the resume checkpoint")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Transcription processes (default: all cores)")
+        parser.add_argument("--engine", choices=["vosk", "configured"], default="vosk",
+                            help="vosk: transcribe_with_vosk; configured: the TRANSCRIPTION_BACKEND transcriber")
+        parser.add_argument("--topic", default="general", help="Topic for recordings the manifest doesn't give one")
+        parser.add_argument("--batch-size", type=int, default=10, help="Answers scored per model call")
+        parser.add_argument("--eval-threads", type=int, default=4, help="Concurrent evaluation calls")
+        parser.add_argument("--no-evaluate", action="store_true", help="Only transcribe")
+        parser.add_argument("--max-attempts", type=int, default=2, help="Solo worker crashes before a recording is recorded as failed")
+        parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and truncate the output")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["source"]):
+            raise CommandError(f"{options['source']} does not exist")
+        if options["engine"] == "vosk":
+            from api import utils
+            if not os.path.isdir(utils.VOSK_MODEL_PATH):
+                raise CommandError(f"No Vosk model at {utils.VOSK_MODEL_PATH}; set VOSK_MODEL_PATH")
+        if options["restart"] and os.path.exists(options["output"]):
+            open(options["output"], "w").close()
+
+        items = read_items(options["source"], options["topic"])
+        done = read_checkpoint(options["output"])
+        pending = [item for item in items if item["id"] not in done]
+        self.stderr.write(f"{len(items)} recordings, {len(items) - len(pending)} already done, "
+                          f"{len(pending)} to process on {options['workers']} processes")
+
+        writer = ResultWriter(options["output"])
+        self.evaluation = None if options["no_evaluate"] else ThreadPoolExecutor(
+            max_workers=options["eval_threads"], thread_name_prefix="evaluate"
+        )
+        self.batch_size = max(1, options["batch_size"])
+        self.batches = defaultdict(list)  # topic -> transcribed records waiting to be scored
+        self.evaluations = []
+        start = time.perf_counter()
+        try:
+            self._transcribe_all(pending, writer, options)
+            for topic in list(self.batches):
+                self._flush(topic, writer)
+            for future in self.evaluations:
+                future.result()
+        except KeyboardInterrupt:
+            self.stderr.write("Interrupted; rerun the same command to resume")
+            sys.exit(130)
+        finally:
+            if self.evaluation:
+                self.evaluation.shutdown(wait=True, cancel_futures=True)
+            writer.close()
+
+        elapsed = time.perf_counter() - start
+        counts = ", ".join(f"{count} {status}" for status, count in sorted(writer.counts.items())) or "nothing to do"
+        self.stdout.write(f"{counts} in {elapsed:.1f} s -> {options['output']}")
+
+    # --- transcription ---------------------------------------------------------
+
+    def _pool(self, options):
+        return ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=_init_worker, initargs=(options["engine"],)
+        )
+
+    def _transcribe_all(self, pending, writer, options):
+        """
+        Keep the pool busy with a bounded window of recordings. After a crash
+        the pool is rebuilt and the recordings that were in flight are rerun
+        one at a time, so only the one that crashes on its own uses up attempts.
+        """
+        queue = list(reversed(pending))
+        suspects = []
+        crashes = defaultdict(int)
+        window = options["workers"] * 2
+        pool = self._pool(options)
+        in_flight = {}
+        try:
+            while queue or suspects or in_flight:
+                if suspects:
+                    if not in_flight:
+                        item = suspects.pop()
+                        in_flight[pool.submit(transcribe, item["path"], options["engine"])] = item
+                while not suspects and queue and len(in_flight) < window:
+                    item = queue.pop()
+                    in_flight[pool.submit(transcribe, item["path"], options["engine"])] = item
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in finished:
+                    item = in_flight.pop(future)
+                    try:
+                        transcript, seconds = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        in_flight[future] = item
+                        continue
+                    except Exception as e:
+                        self._record(item, writer, error=f"transcription failed: {e}")
+                        continue
+                    self._record(item, writer, transcript=transcript, seconds=seconds)
+                if broken:
+                    # Every recording still in flight is lost with the pool
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self.stderr.write(f"A worker process died; retrying {len(in_flight)} recordings on a new pool")
+                    if len(in_flight) == 1:
+                        item, = in_flight.values()
+                        crashes[item["id"]] += 1
+                        if crashes[item["id"]] >= options["max_attempts"]:
+                            self._record(item, writer, error="worker process crashed")
+                        else:
+                            suspects.append(item)
+                    else:
+                        suspects.extend(in_flight.values())
+                    in_flight = {}
+                    pool = self._pool(options)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _record(self, item, writer, transcript=None, seconds=None, error=None):
+        record = {
+            "id": item["id"],
+            "path": item["path"],
+            "topic": item["topic"],
+            "question": item["question"],
+            "transcript": transcript,
+            "transcribe_seconds": round(seconds, 3) if seconds is not None else None,
+            "score": None,
+            "feedback": None,
+            "status": "failed" if error else "done",
+        }
+        if error:
+            record["error"] = error
+        if error or self.evaluation is None:
+            writer.write(record)
+            return
+        if not transcript:
+            record["status"], record["error"] = "failed", "no speech recognized"
+            writer.write(record)
+            return
+        batch = self.batches[item["topic"]]
+        batch.append(record)
+        if len(batch) >= self.batch_size:
+            self._flush(item["topic"], writer)
+
+    def _flush(self, topic, writer):
+        records = self.batches.pop(topic, [])
+        if records:
+            self.evaluations.append(self.evaluation.submit(self._evaluate, topic, records, writer))
+
+    def _evaluate(self, topic, records, writer):
+        try:
+            evaluate_batch(topic, records)
+        except Exception as e:
+            for record in records:
+                record["status"], record["error"] = "failed", f"evaluation failed: {e}"
+        finally:
+            from django.db import connections
+            connections.close_all()
+        for record in records:
+            writer.write(record)
@@ -0,0 +1,341 @@
+"""
+Load test the interview API.
+
+Starts gunicorn (sync gthread workers, or uvicorn workers with --asgi) on a
+local port and drives N concurrent simulated interviews through question/,
+answer/ and end/. By default the server runs with the mock LLM and
+speech-to-text backends (api/mock_llm.py), so results measure this app
+rather than Gemini; tune them with the MOCK_* settings or pass --live.
+
+    python manage.py loadtest --interviews 50 --workers 4
+    python manage.py loadtest --asgi --interviews 200 --workers 2
+    MOCK_LLM_LATENCY=1.5 python manage.py loadtest --json
+
+Reports p50/p95/p99 latency per endpoint, requests per second, requests
+shed by admission control (429/503) and the peak resident memory of each
+gunicorn worker. Every simulated client shares one address, so the server's
+per-client rate limit is off unless ADMISSION_RATE is set.
+"""
+import io
+import os
+import sys
+import json
+import math
+import time
+import wave
+import socket
+import struct
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+TOPICS = ["Python", "Django", "System design", "Databases", "Networking"]
+ENDPOINTS = ["question", "answer", "end"]
+SHED_STATUS = {429, 503}
+
+
+def synthetic_wav(seconds=3.0, rate=16000, pause=0.5):
+    """
+    A mono 16-bit tone pulsing like syllables between short pauses, so the
+    local backends have real audio to decode and the voice activity
+    detection in api/preprocess.py has speech to find
+    """
+    def sample(i):
+        t = i / rate
+        if t < pause or t > seconds - pause:
+            return 0
+        envelope = 0.6 + 0.4 * math.sin(2 * math.pi * 4 * t)
+        return int(8000 * envelope * math.sin(2 * math.pi * 220 * t))
+
+    frames = b"".join(struct.pack("<h", sample(i)) for i in range(int(seconds * rate)))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(frames)
+    return buffer.getvalue()
+
+
+def outcome_of(status_code):
+    if status_code in SHED_STATUS:
+        return "shed"
+    return "ok" if status_code < 400 else "error"
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def worker_pids(master_pid):
+    """PIDs of the processes whose parent is ``master_pid`` (Linux /proc)"""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == master_pid:
+            pids.append(int(entry))
+    return pids
+
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler(threading.Thread):
+    """Track the peak RSS of each gunicorn worker while the test runs"""
+
+    def __init__(self, master_pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.interval = interval
+        self.peak = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def sample(self):
+        for pid in worker_pids(self.master_pid):
+            rss = rss_mb(pid)
+            if rss is not None:
+                self.peak[pid] = max(self.peak.get(pid, 0.0), rss)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.sample()
+
+
+class Command(BaseCommand):
+    help = "Drive concurrent simulated interviews through the API and report latency, throughput and worker memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interviews", type=int, default=20, help="Concurrent simulated interviews")
+        parser.add_argument("--rounds", type=int, default=1, help="Interviews each simulated client runs back to back")
+        parser.add_argument("--questions", type=int, default=3, help="Answers submitted per interview")
+        parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+        parser.add_argument("--threads", type=int, default=8, help="Threads per sync worker")
+        parser.add_argument("--asgi", action="store_true", help="Serve with uvicorn workers and ASYNC_VIEWS=True")
+        parser.add_argument("--live", action="store_true", help="Use the configured backends instead of the mocks")
+        parser.add_argument("--url", help="Benchmark an already running server instead of starting gunicorn")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--audio", help="Answer recording to upload (default: a 3 s synthetic WAV)")
+        parser.add_argument("--timeout", type=float, default=120, help="Per-request client timeout in seconds")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        try:
+            import requests  # noqa: F401
+        except ImportError:
+            raise CommandError("The load test client needs the requests package")
+
+        if options["audio"]:
+            with open(options["audio"], "rb") as f:
+                audio = f.read()
+            mime_type = "audio/webm" if options["audio"].endswith(".webm") else "audio/wav"
+        else:
+            audio, mime_type = synthetic_wav(), "audio/wav"
+
+        server = sampler = None
+        base_url = options["url"]
+        if not base_url:
+            server, log_path = self._start_server(options)
+            base_url = f"http://127.0.0.1:{options['port']}"
+            sampler = MemorySampler(server.pid)
+            sampler.start()
+
+        try:
+            results, elapsed = self._run(base_url, audio, mime_type, options)
+        finally:
+            if sampler:
+                sampler.stop()
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+
+        report = self._report(results, elapsed, sampler, options)
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print_report(report)
+
+    # --- server -------------------------------------------------------------
+
+    def _start_server(self, options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="mockmate.settings", PYTHONUNBUFFERED="1")
+        if not options["live"]:
+            env.setdefault("LLM_BACKEND", "mock")
+            env.setdefault("TRANSCRIPTION_BACKEND", "mock")
+            env.setdefault("GEMINI_API_KEY", "mock")
+        if options["asgi"]:
+            env["ASYNC_VIEWS"] = "True"
+            app, worker_args = "mockmate.asgi:application", ["-k", "uvicorn.workers.UvicornWorker"]
+        else:
+            env["ASYNC_VIEWS"] = "False"
+            app, worker_args = "mockmate.wsgi:application", ["-k", "gthread", "--threads", str(options["threads"])]
+
+        # Sessions live in the shared 'interviews' cache (database by default);
+        # interview history is written to the api tables as the run goes
+        call_command("migrate", verbosity=0)
+        call_command("createcachetable", verbosity=0)
+
+        cmd = [
+            sys.executable, "-m", "gunicorn", app,
+            "--bind", f"127.0.0.1:{options['port']}",
+            "--workers", str(options["workers"]),
+            "--timeout", str(int(options["timeout"])),
+            *worker_args,
+        ]
+        log = tempfile.NamedTemporaryFile(prefix="loadtest-", suffix=".log", delete=False)
+        server = subprocess.Popen(cmd, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        self.stderr.write(f"Started gunicorn ({'ASGI' if options['asgi'] else 'sync'}, "
+                          f"{options['workers']} workers), log: {log.name}")
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"gunicorn exited with status {server.returncode}, see {log.name}")
+            try:
+                socket.create_connection(("127.0.0.1", options["port"]), timeout=1).close()
+                return server, log.name
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f"gunicorn did not start listening within 30s, see {log.name}")
+
+    # --- clients ------------------------------------------------------------
+
+    def _run(self, base_url, audio, mime_type, options):
+        results = []  # (endpoint, seconds, outcome); list.append is thread-safe
+        clients = options["interviews"]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            futures = [pool.submit(self._client, n, base_url, audio, mime_type, options, results) for n in range(clients)]
+            for future in futures:
+                future.result()
+        return results, time.perf_counter() - start
+
+    def _client(self, n, base_url, audio, mime_type, options, results):
+        import requests
+
+        http = requests.Session()
+        timeout = options["timeout"]
+
+        def timed(endpoint, method, path, **kwargs):
+            start = time.perf_counter()
+            try:
+                response = method(base_url + path, timeout=timeout, **kwargs)
+                outcome = outcome_of(response.status_code)
+            except requests.RequestException:
+                response, outcome = None, "error"
+            results.append((endpoint, time.perf_counter() - start, outcome))
+            return response if outcome == "ok" else None
+
+        for round_number in range(options["rounds"]):
+            topic = TOPICS[(n + round_number) % len(TOPICS)]
+            response = timed("question", http.get, "/api/question/", params={"topic": topic})
+            if response is None:
+                continue
+            opener = response.json()
+            session_id, question_id = opener["session_id"], opener["question_id"]
+            for _ in range(options["questions"]):
+                response = timed("answer", http.post, "/api/answer/",
+                                 data={"session_id": session_id, "question_id": question_id},
+                                 files={"audio": ("answer.wav", audio, mime_type)})
+                if response is None:
+                    break
+                question_id = response.json()["question_id"]
+            self._end(http, base_url, session_id, timeout, results)
+
+    def _end(self, http, base_url, session_id, timeout, results):
+        """End an interview; with summary jobs, poll until the evaluation is ready"""
+        import requests
+
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = http.post(base_url + "/api/end/", json={"session_id": session_id}, timeout=timeout)
+            outcome = outcome_of(response.status_code)
+            ok = outcome == "ok"
+            if response.status_code == 202:
+                job_url = f"{base_url}/api/end/{response.json()['job_id']}/"
+                while ok and time.perf_counter() - start < timeout:
+                    time.sleep(0.25)
+                    job = http.get(job_url, timeout=timeout).json()
+                    if job.get("status") in ("done", "failed", None):
+                        ok = job.get("status") == "done"
+                        break
+                else:
+                    ok = False
+                outcome = "ok" if ok else "error"
+        except requests.RequestException:
+            outcome = "error"
+        results.append(("end", time.perf_counter() - start, outcome))
+
+    # --- report -------------------------------------------------------------
+
+    def _report(self, results, elapsed, sampler, options):
+        def summarize(samples):
+            latencies = sorted(seconds * 1000 for _, seconds, outcome in samples if outcome == "ok")
+            return {
+                "requests": len(samples),
+                "errors": sum(1 for _, _, outcome in samples if outcome == "error"),
+                "shed": sum(1 for _, _, outcome in samples if outcome == "shed"),
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "p99_ms": round(percentile(latencies, 99), 1),
+                "mean_ms": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+            }
+
+        endpoints = {name: summarize([r for r in results if r[0] == name]) for name in ENDPOINTS}
+        endpoints["all"] = summarize(results)
+        return {
+            "mode": "asgi" if options["asgi"] else "sync",
+            "backends": "live" if options["live"] else "mock",
+            "interviews": options["interviews"] * options["rounds"],
+            "workers": options["workers"],
+            "elapsed_s": round(elapsed, 2),
+            "requests_per_s": round(len(results) / elapsed, 1) if elapsed else 0.0,
+            "endpoints": endpoints,
+            "worker_peak_rss_mb": {str(pid): round(mb, 1) for pid, mb in sorted(sampler.peak.items())} if sampler else {},
+        }
+
+    def _print_report(self, report):
+        self.stdout.write(
+            f"\n{report['interviews']} interviews, {report['mode']} workers x{report['workers']}, "
+            f"{report['backends']} backends: {report['elapsed_s']} s, {report['requests_per_s']} req/s\n"
+        )
+        self.stdout.write(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'shed':>8}"
+                          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+        for name, row in report["endpoints"].items():
+            self.stdout.write(
+                f"{name:<10}{row['requests']:>10}{row['errors']:>8}{row['shed']:>8}{row['p50_ms']:>10}"
+                f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['mean_ms']:>10}"
+            )
+        if report["worker_peak_rss_mb"]:
+            self.stdout.write("\nPeak RSS per worker:")
+            for pid, mb in report["worker_peak_rss_mb"].items():
+                self.stdout.write(f"  pid {pid}: {mb} MB")
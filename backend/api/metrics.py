@@ -0,0 +1,255 @@
+"""
+In-process metrics, exposed at /api/metrics in the Prometheus text format.
+
+Counters and histograms are updated on the hot path (stage timers, upstream
+calls and tokens, audio sizes); gauges are collected at scrape time from the
+stats the components already keep (session store, transcription backends,
+LLM limiter, opener pool, prefetch, reply cache).
+
+Values are per worker process: with several gunicorn workers each scrape
+sees the worker that served it, so label series by instance/pod and sum.
+The endpoint is off unless METRICS_ENABLED=True, and takes a bearer token
+when METRICS_TOKEN is set.
+"""
+import os
+import hmac
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse, Http404
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "mockmate_"
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = PREFIX + name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = self.header()
+        names = self.labelnames + ("le",)
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(names, key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics plus scrape-time collectors returning gauge samples"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, buckets, labelnames=()):
+        metric = Histogram(name, help, buckets, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """Register ``fn() -> iterable of (name, help, {labels}, value)`` gauge samples"""
+        self.collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        gauges = {}
+        for collect in self.collectors:
+            try:
+                for name, help, labels, value in collect():
+                    gauges.setdefault(name, (help, []))[1].append((labels, value))
+            except Exception as e:
+                logger.warning(f"Metrics collector {collect.__name__} failed: {e}")
+        for name, (help, samples) in gauges.items():
+            lines += [f"# HELP {PREFIX}{name} {help}", f"# TYPE {PREFIX}{name} gauge"]
+            for labels, value in samples:
+                lines.append(f"{PREFIX}{name}{_labels(tuple(labels), tuple(labels.values()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "stage_seconds", "Time spent in each answer-processing stage",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    labelnames=("endpoint", "stage"),
+)
+LLM_SECONDS = registry.histogram(
+    "llm_call_seconds", "Upstream model call latency, including retries",
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+    labelnames=("outcome",),
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "Upstream tokens by kind (prompt, output, cached: prompt tokens served from the implicit prefix cache)",
+    labelnames=("kind",),
+)
+AUDIO_BYTES = registry.histogram(
+    "audio_bytes", "Size of uploaded answer recordings",
+    buckets=(16_000, 64_000, 256_000, 1_000_000, 4_000_000, 10_000_000),
+)
+PARSED_REPLIES = registry.counter(
+    "model_replies_parsed_total", "Model replies by parse outcome (json, markers, partial, failed)",
+    labelnames=("kind", "outcome"),
+)
+CONTEXT_FOLDS = registry.counter(
+    "context_folds_total", "Conversation context folds by method (model, extractive, fallback: model fold failed)",
+    labelnames=("method",),
+)
+AUDIO_PREPROCESSED = registry.counter(
+    "audio_preprocessed_total", "Answer uploads by preprocessing outcome (opus, wav, pcm, original, silent, undecodable)",
+    labelnames=("outcome",),
+)
+ADMISSION_REJECTED = registry.counter(
+    "admission_rejected_total", "Requests turned away by admission control (rate_limited, queue_full, queue_timeout)",
+    labelnames=("endpoint", "reason"),
+)
+AUDIO_SECONDS = registry.histogram(
+    "audio_seconds", "Duration of answer recordings decoded by the app",
+    buckets=(1, 5, 15, 30, 60, 120, 300),
+)
+
+
+@contextmanager
+def stage(endpoint, name):
+    """Time one stage of a request into mockmate_stage_seconds"""
+    with STAGE_SECONDS.time(endpoint=endpoint, stage=name):
+        yield
+
+
+def record_llm_call(seconds, response=None, ok=True):
+    LLM_SECONDS.observe(seconds, outcome="ok" if ok else "error")
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        LLM_TOKENS.inc(getattr(usage, "prompt_token_count", 0) or 0, kind="prompt")
+        LLM_TOKENS.inc(getattr(usage, "candidates_token_count", 0) or 0, kind="output")
+        # Part of the prompt tokens Gemini served from its implicit prefix cache
+        LLM_TOKENS.inc(getattr(usage, "cached_content_token_count", 0) or 0, kind="cached")
+
+
+def _flatten(prefix, help, stats, labels=None):
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}_{key}", help, dict(labels or {}), value
+
+
+@registry.collector
+def _component_stats():
+    from . import admission, jobs, llm, log, prefetch, prompts, startup, transcription
+    from .sessions import get_session_store
+    from .openers import get_opener_pool
+    from .replay import get_replay_cache
+
+    yield "worker_pid", "PID of the worker that served this scrape", {}, os.getpid()
+    yield from _flatten("startup", "Startup time of this worker in milliseconds (see api/startup.py)",
+                        {key: value for key, value in startup.report().items() if key != "phases_ms"})
+    for name, ms in startup.report()["phases_ms"].items():
+        yield "startup_phase_ms", "Startup warm-up phases in milliseconds", {"phase": name}, ms
+    yield "log_records_dropped", "Log records dropped because the log queue was full", {}, log.dropped_records()
+    store = get_session_store()
+    yield from _flatten("session_store", "Session store counters and sizes", store.stats(),
+                        {"backend": type(store).__name__})
+    yield from _flatten("llm", "Shared LLM client limiter and retries", llm.stats())
+    gates = admission.stats()
+    for endpoint, stats in gates["endpoints"].items():
+        yield from _flatten("admission", "Admission control per endpoint (this worker)", stats, {"endpoint": endpoint})
+    yield from _flatten("admission_rate", "Per-client rate limiter (this worker)", gates["rate_limiter"])
+    yield from _flatten("prompts", "Compiled prompt templates (this worker)", prompts.stats())
+    yield from _flatten("prefetch", "Follow-up question prefetch counters", prefetch.get_stats())
+    yield from _flatten("summary_jobs", "Background end-of-interview evaluations (this worker)", jobs.get_stats())
+    yield from _flatten("replay_cache", "Stored replies (per-worker tier)", get_replay_cache().stats())
+    pool = get_opener_pool()
+    if pool:
+        yield from _flatten("opener_pool", "Pre-generated opener pool", pool.stats())
+    if transcription.transcriber_built():
+        for backend, stats in transcription.get_transcriber().stats().items():
+            yield from _flatten("transcription", "Transcription calls and latency per backend", stats,
+                                {"backend": backend})
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if settings.METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"
+    ):
+        return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,169 @@
+"""
+Request middleware for the interview API.
+
+TraceIdMiddleware gives every request a trace ID (the client's X-Request-ID
+when it sends a sane one, otherwise a random one), returns it in the
+X-Request-ID response header and makes it available to log records through
+TraceIdFilter, so all lines logged for one answer can be grepped together.
+
+admission_control_middleware turns requests away with 429/503 and a
+Retry-After header before the view runs when a client is over its rate or
+an endpoint is saturated (see api/admission.py; only under WSGI is that
+also before the upload is read).
+"""
+import re
+import uuid
+import logging
+import contextvars
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import resolve, Resolver404
+from django.utils.decorators import sync_and_async_middleware
+
+from . import admission, metrics
+
+HEADER = "X-Request-ID"
+_VALID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+logger = logging.getLogger(__name__)
+
+trace_id = contextvars.ContextVar("trace_id", default="-")
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds ``trace_id`` to every record ("-" outside a request)"""
+
+    def filter(self, record):
+        record.trace_id = trace_id.get()
+        return True
+
+
+def _start_trace(request):
+    incoming = request.headers.get(HEADER, "")
+    value = incoming if _VALID.match(incoming) else uuid.uuid4().hex[:16]
+    # Not reset after the view returns: streamed responses keep logging
+    # with it, and the next request on this thread/task sets its own
+    trace_id.set(value)
+    request.trace_id = value
+    return value
+
+
+@sync_and_async_middleware
+def trace_id_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            value = _start_trace(request)
+            response = await get_response(request)
+            response[HEADER] = value
+            return response
+    else:
+        def middleware(request):
+            value = _start_trace(request)
+            response = get_response(request)
+            response[HEADER] = value
+            return response
+    return middleware
+
+
+MESSAGES = {
+    429: "Too many requests, please slow down",
+    503: "Server is busy, please try again shortly",
+}
+
+
+def _endpoint(request):
+    try:
+        return resolve(request.path_info).url_name
+    except Resolver404:
+        return None
+
+
+def _rejected(endpoint, error):
+    metrics.ADMISSION_REJECTED.inc(endpoint=endpoint, reason=error.reason)
+    logger.warning(f"Rejected {endpoint} request: {error.reason}, retry after {error.retry_after}s")
+    response = JsonResponse(
+        {"error": MESSAGES[error.status], "retry_after": error.retry_after},
+        status=error.status,
+    )
+    response["Retry-After"] = str(error.retry_after)
+    # Logged above as a warning; keep django.request from reporting every
+    # shed request as a server error
+    response._has_been_logged = True
+    return response
+
+
+class _SlotStream:
+    """Streamed content that frees its admission slot when finished or closed"""
+
+    def __init__(self, content, release):
+        self.content = content
+        self.close = release
+
+    def __iter__(self):
+        try:
+            yield from self.content
+        finally:
+            self.close()
+
+
+class _AsyncSlotStream(_SlotStream):
+    __iter__ = None
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self.content:
+                yield chunk
+        finally:
+            self.close()
+
+
+def _hold_until_sent(response, release):
+    """Release now, or when a streamed response has been sent"""
+    if not response.streaming:
+        release()
+    elif response.is_async:
+        response.streaming_content = _AsyncSlotStream(response.streaming_content, release)
+    else:
+        response.streaming_content = _SlotStream(response.streaming_content, release)
+    return response
+
+
+@sync_and_async_middleware
+def admission_control_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            endpoint = _endpoint(request) if settings.ADMISSION_CONTROL else None
+            gate = admission.get_gate(endpoint) if endpoint else None
+            if gate is None:
+                return await get_response(request)
+            try:
+                admission.check_rate(request)
+                release = await gate.aacquire()
+            except admission.Rejected as e:
+                return _rejected(endpoint, e)
+            try:
+                response = await get_response(request)
+            except BaseException:
+                release()
+                raise
+            return _hold_until_sent(response, release)
+    else:
+        def middleware(request):
+            endpoint = _endpoint(request) if settings.ADMISSION_CONTROL else None
+            gate = admission.get_gate(endpoint) if endpoint else None
+            if gate is None:
+                return get_response(request)
+            try:
+                admission.check_rate(request)
+                release = gate.acquire()
+            except admission.Rejected as e:
+                return _rejected(endpoint, e)
+            try:
+                response = get_response(request)
+            except BaseException:
+                release()
+                raise
+            return _hold_until_sent(response, release)
+    return middleware
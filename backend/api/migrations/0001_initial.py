@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterviewSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.CharField(max_length=64)),
+                ('client_id', models.CharField(blank=True, default='', max_length=64)),
+                ('topic', models.CharField(max_length=100)),
+                ('questions_asked', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-ended_at', '-id'],
+                'indexes': [models.Index(fields=['client_id', '-ended_at', '-id'], name='api_session_client_idx'), models.Index(fields=['client_id', 'topic', '-ended_at', '-id'], name='api_session_topic_idx'), models.Index(fields=['topic', '-ended_at'], name='api_session_topic_time_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Evaluation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('final_feedback', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='evaluation', to='api.interviewsession')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Turn',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('question', models.TextField(blank=True, default='')),
+                ('transcript', models.TextField(blank=True, default='')),
+                ('feedback', models.TextField(blank=True, default='')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='turns', to='api.interviewsession')),
+            ],
+            options={
+                'ordering': ['number'],
+                'constraints': [models.UniqueConstraint(fields=('session', 'number'), name='api_turn_unique_number')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:16
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicate_session_ids(apps, schema_editor):
+    # Client-chosen session IDs could repeat; keep every row, suffixing all
+    # but the newest of each duplicate with its primary key
+    InterviewSession = apps.get_model('api', 'InterviewSession')
+    duplicates = (
+        InterviewSession.objects.values('session_id')
+        .annotate(rows=Count('id')).filter(rows__gt=1).values_list('session_id', flat=True)
+    )
+    for session_id in list(duplicates):
+        for record in InterviewSession.objects.filter(session_id=session_id).order_by('-id')[1:]:
+            record.session_id = f'{session_id[:40]}-{record.id}'
+            record.save(update_fields=['session_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='interviewsession',
+            options={'ordering': ['-started_at', '-id']},
+        ),
+        migrations.RemoveIndex(
+            model_name='interviewsession',
+            name='api_session_client_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='interviewsession',
+            name='api_session_topic_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='interviewsession',
+            name='api_session_topic_time_idx',
+        ),
+        migrations.RunPython(rename_duplicate_session_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='interviewsession',
+            name='session_id',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='interviewsession',
+            index=models.Index(fields=['client_id', '-started_at', '-id'], name='api_session_client_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interviewsession',
+            index=models.Index(fields=['client_id', 'topic', '-started_at', '-id'], name='api_session_topic_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interviewsession',
+            index=models.Index(fields=['topic', '-started_at'], name='api_session_topic_time_idx'),
+        ),
+    ]
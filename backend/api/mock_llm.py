@@ -0,0 +1,155 @@
+"""
+Deterministic local stand-in for Gemini, for load tests and offline work.
+
+Selected with LLM_BACKEND=mock. MockModel answers every prompt this app
+sends with canned text in the expected format (the same prompt always gets
+the same reply) and simulates upstream timing: MOCK_LLM_LATENCY seconds to
+the first token, then MOCK_LLM_TOKENS_PER_SEC for the rest of the output.
+"""
+import re
+import json
+import time
+import asyncio
+import hashlib
+
+from django.conf import settings
+
+from . import interview, parsing
+
+_TOPIC = re.compile(r"^INTERVIEW TOPIC: (.+)$", re.M)
+_ANSWER = re.compile(r"^ANSWER \d+$", re.M)
+_COUNT = re.compile(r"(?:Generate|Output exactly) (\d+)")
+
+QUESTIONS = [
+    "How would you explain the core ideas of {topic} to a new team member?",
+    "Tell me about a project where {topic} played a central role.",
+    "What trade-offs do you weigh when applying {topic} in production?",
+    "Which common mistakes do people make with {topic}, and how do you avoid them?",
+    "How do you keep up with changes and best practices in {topic}?",
+]
+FEEDBACK = [
+    "Good structure and a clear example. Try to mention the trade-offs explicitly.",
+    "You covered the main points well. A concrete metric would make it stronger.",
+    "Solid answer with practical detail. Be a little more concise next time.",
+]
+TRANSCRIPT = "I would start by describing the problem, then walk through the approach I used and what I learned from it."
+
+
+class MockResponse:
+    """The parts of a GenerateContentResponse this app reads"""
+
+    def __init__(self, text, prompt_tokens=0):
+        self.text = text
+        self.usage_metadata = type("Usage", (), {
+            "prompt_token_count": prompt_tokens,
+            "candidates_token_count": _tokens(text),
+            "cached_content_token_count": 0,
+        })()
+
+
+def _tokens(text):
+    return len(text) // 4 + 1
+
+
+def _prompt_text(contents):
+    if isinstance(contents, str):
+        return contents
+    return "\n".join(part for part in contents if isinstance(part, str))
+
+
+def reply_for(contents):
+    """Canned reply in the format the prompt asks for"""
+    prompt = _prompt_text(contents)
+    seed = int(hashlib.sha1(prompt.encode()).hexdigest()[:8], 16)
+    match = _TOPIC.search(prompt)
+    topic = match.group(1) if match else "this topic"
+    count = int(_COUNT.search(prompt).group(1)) if _COUNT.search(prompt) else 1
+
+    def question(i=0):
+        return QUESTIONS[(seed + i) % len(QUESTIONS)].format(topic=topic)
+
+    feedback = FEEDBACK[seed % len(FEEDBACK)]
+
+    if prompt == interview.TRANSCRIBE_PROMPT:
+        return TRANSCRIPT
+    if "Score each numbered answer" in prompt:
+        return json.dumps([
+            {"id": i, "score": 5 + (seed + i) % 5, "feedback": FEEDBACK[(seed + i) % len(FEEDBACK)]}
+            for i in range(1, len(_ANSWER.findall(prompt)) + 1)
+        ])
+    if "TRANSCRIPT:" in prompt:
+        return f"TRANSCRIPT: {TRANSCRIPT}\nFEEDBACK: {feedback}\nNEXT_QUESTION: {question()}"
+    if "DIFFERENT openers" in prompt:
+        return "\n\n".join(f"GREETING: Hi, I am your interviewer\nQUESTION: {question(i)}" for i in range(count))
+    if "GREETING:" in prompt:
+        return f"GREETING: Hi, I am your interviewer\nQUESTION: {question()}"
+    if "QUESTION: [question]" in prompt:
+        return "\n".join(f"QUESTION: {question(i)}" for i in range(count))
+    if "CANDIDATE NEXT QUESTIONS" in prompt:
+        return f"FEEDBACK: {feedback}\nNEXT_QUESTION: {seed % 3 + 1}"
+    if "NEXT_QUESTION:" in prompt:
+        return f"FEEDBACK: {feedback}\nNEXT_QUESTION: {question()}"
+    if "FEEDBACK:" in prompt:
+        return f"FEEDBACK: {feedback}"
+    return (
+        f"Overall you showed a good working knowledge of {topic}. Your answers were "
+        "well structured and grounded in real experience. To improve, quantify the "
+        "impact of your work and discuss trade-offs more explicitly."
+    )
+
+
+def _structured(text, generation_config):
+    """Re-encode a marker reply as JSON when the call asked for a response schema"""
+    if not generation_config or generation_config.get("response_mime_type") != "application/json":
+        return text
+    if generation_config["response_schema"].get("type") != "object":
+        return text
+    names = tuple(generation_config["response_schema"]["properties"])
+    fields = parsing.parse_markers(text, names)
+    return json.dumps({name: fields.get(name, "") for name in names})
+
+
+def _chunks(text, size=40):
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+class MockModel:
+    """GenerativeModel look-alike with simulated latency and token rate"""
+
+    def __init__(self, model_name=interview.MODEL_NAME, system_instruction=None, **options):
+        self.model_name = model_name
+        self.latency = settings.MOCK_LLM_LATENCY
+        self.tokens_per_sec = settings.MOCK_LLM_TOKENS_PER_SEC
+        self.instruction_tokens = _tokens(system_instruction) if system_instruction else 0
+
+    def _response(self, text, contents):
+        return MockResponse(text, self.instruction_tokens + _tokens(_prompt_text(contents)))
+
+    def _duration(self, text):
+        return _tokens(text) / self.tokens_per_sec
+
+    def generate_content(self, contents, stream=False, generation_config=None, **kwargs):
+        text = _structured(reply_for(contents), generation_config)
+        if stream:
+            return self._stream(text)
+        time.sleep(self.latency + self._duration(text))
+        return self._response(text, contents)
+
+    def _stream(self, text):
+        time.sleep(self.latency)
+        for chunk in _chunks(text):
+            time.sleep(self._duration(chunk))
+            yield MockResponse(chunk)
+
+    async def generate_content_async(self, contents, stream=False, generation_config=None, **kwargs):
+        text = _structured(reply_for(contents), generation_config)
+        if stream:
+            return self._astream(text)
+        await asyncio.sleep(self.latency + self._duration(text))
+        return self._response(text, contents)
+
+    async def _astream(self, text):
+        await asyncio.sleep(self.latency)
+        for chunk in _chunks(text):
+            await asyncio.sleep(self._duration(chunk))
+            yield MockResponse(chunk)
@@ -0,0 +1,52 @@
+"""
+Interview history, persisted turn by turn.
+
+Live interviews stay in the session store (api/sessions.py); api/history.py
+mirrors each one here as it starts, after every answered turn and when it
+ends, and serves the keyset-paginated history endpoints. ``client_id`` is the anonymous ID the
+frontend keeps in localStorage.
+"""
+from django.db import models
+
+
+class InterviewSession(models.Model):
+    session_id = models.CharField(max_length=64, unique=True)
+    client_id = models.CharField(max_length=64, blank=True, default="")
+    topic = models.CharField(max_length=100)
+    questions_asked = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+
+    class Meta:
+        # Pages are keyed on started_at, which never changes once written;
+        # ended_at moves with every turn
+        ordering = ["-started_at", "-id"]
+        indexes = [
+            # History pages: newest first per client, optionally per topic
+            models.Index(fields=["client_id", "-started_at", "-id"], name="api_session_client_idx"),
+            models.Index(fields=["client_id", "topic", "-started_at", "-id"], name="api_session_topic_idx"),
+            models.Index(fields=["topic", "-started_at"], name="api_session_topic_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} interview {self.session_id}"
+
+
+class Turn(models.Model):
+    session = models.ForeignKey(InterviewSession, on_delete=models.CASCADE, related_name="turns")
+    number = models.PositiveIntegerField()
+    question = models.TextField(blank=True, default="")
+    transcript = models.TextField(blank=True, default="")
+    feedback = models.TextField(blank=True, default="")
+
+    class Meta:
+        ordering = ["number"]
+        constraints = [
+            models.UniqueConstraint(fields=["session", "number"], name="api_turn_unique_number"),
+        ]
+
+
+class Evaluation(models.Model):
+    session = models.OneToOneField(InterviewSession, on_delete=models.CASCADE, related_name="evaluation")
+    final_feedback = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
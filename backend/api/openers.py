@@ -0,0 +1,163 @@
+"""
+Pre-generated opening questions.
+
+Starting an interview used to wait for a Gemini call that sends the same
+prompt for a given topic every time. OpenerPool keeps a small per-topic pool
+of GREETING/QUESTION pairs per worker, hands them out at random (each one at
+most once, and only until it expires) and refills in the background when a
+pool runs low. A cold topic falls back to the live model call.
+
+Only the configured topics are pooled, plus topics this worker has been
+asked for at least ``min_requests`` times: a batch of openers for a one-off
+free-text topic would just double its cost. A refill that fails or parses
+to nothing isn't retried for ``retry_after`` seconds.
+"""
+import time
+import random
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import llm, parsing, prompts
+
+logger = logging.getLogger(__name__)
+
+
+def batch_opening_prompt(topic, count):
+    return prompts.render("batch_opening", topic, count=count)
+
+
+class OpenerPool:
+    """Per-topic pools of (greeting, question, created_at), refilled in the background"""
+
+    def __init__(self, size=8, low_water=3, ttl=3600, max_topics=50, topics=(), min_requests=3, retry_after=300):
+        self.size = size
+        self.low_water = low_water
+        self.ttl = ttl
+        self.max_topics = max_topics
+        self.topics = {self._key(topic) for topic in topics}
+        self.min_requests = min_requests
+        self.retry_after = retry_after
+        self.hits = 0
+        self.misses = 0
+        self.failed_refills = 0
+        self._pools = OrderedDict()
+        self._requests = OrderedDict()  # requests per topic that isn't pooled yet
+        self._failed = {}  # key -> time of the last failed refill
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="openers")
+
+    @staticmethod
+    def _key(topic):
+        return topic.strip().lower()
+
+    def take(self, topic):
+        """Return a random (greeting, question) for the topic, or None if the pool is empty"""
+        key = self._key(topic)
+        now = time.time()
+        with self._lock:
+            if not self._pooled(key):
+                self.misses += 1
+                return None
+            pool = [item for item in self._pools.get(key, []) if now - item[2] < self.ttl]
+            opener = pool.pop(random.randrange(len(pool))) if pool else None
+            self._pools[key] = pool
+            self._pools.move_to_end(key)
+            while len(self._pools) > self.max_topics:
+                self._pools.popitem(last=False)
+            if opener:
+                self.hits += 1
+            else:
+                self.misses += 1
+            refill = (
+                len(pool) < self.low_water and key not in self._refilling
+                and now - self._failed.get(key, 0) >= self.retry_after
+            )
+            if refill:
+                self._refilling.add(key)
+        if refill:
+            self._executor.submit(self._refill, key, topic)
+        return opener[:2] if opener else None
+
+    def _pooled(self, key):
+        """Whether ``key`` gets a pool; counts the request otherwise (lock held)"""
+        if key in self.topics or key in self._pools:
+            return True
+        if not self.min_requests:
+            return False
+        count = self._requests.pop(key, 0) + 1
+        if count >= self.min_requests:
+            return True
+        self._requests[key] = count
+        while len(self._requests) > self.max_topics * 20:
+            self._requests.popitem(last=False)
+        return False
+
+    def warm(self, topics):
+        """Start filling the pools for the given topics"""
+        for topic in topics:
+            key = self._key(topic)
+            with self._lock:
+                if key in self._refilling:
+                    continue
+                self._refilling.add(key)
+            self._executor.submit(self._refill, key, topic)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "failed_refills": self.failed_refills,
+                "topics": len(self._pools),
+                "pooled": sum(len(pool) for pool in self._pools.values()),
+            }
+
+    def _refill(self, key, topic):
+        try:
+            with self._lock:
+                missing = self.size - len(self._pools.get(key, []))
+            if missing <= 0:
+                return
+            response = llm.generate(
+                batch_opening_prompt(topic, missing),
+                generation_config={"temperature": 1.0},
+            )
+            now = time.time()
+            openers = [(greeting, question, now) for greeting, question in parsing.parse_openers(response.text)]
+            if not openers:
+                raise ValueError("no GREETING/QUESTION pairs in the reply")
+            with self._lock:
+                self._pools.setdefault(key, []).extend(openers[:missing])
+                self._failed.pop(key, None)
+            logger.info(f"Refilled opener pool for {topic!r} with {len(openers[:missing])} openers")
+        except Exception as e:
+            logger.warning(f"Opener pool refill for {topic!r} failed, retrying in {self.retry_after}s: {e}")
+            with self._lock:
+                self._failed[key] = time.time()
+                self.failed_refills += 1
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+
+
+_pool = None
+
+
+def get_opener_pool():
+    """Return this worker's opener pool, or None when disabled"""
+    global _pool
+    if _pool is None and settings.OPENER_POOL_ENABLED:
+        _pool = OpenerPool(
+            size=settings.OPENER_POOL_SIZE,
+            low_water=max(1, settings.OPENER_POOL_SIZE // 3),
+            ttl=settings.OPENER_POOL_TTL,
+            topics=settings.OPENER_POOL_TOPICS,
+            min_requests=settings.OPENER_POOL_MIN_REQUESTS,
+        )
+        _pool.warm(settings.OPENER_POOL_TOPICS)
+    return _pool
@@ -0,0 +1,202 @@
+"""
+Parsing of model replies.
+
+With STRUCTURED_OUTPUT=True the opening, answer and feedback calls ask
+Gemini for JSON matching a response schema (``generation_config``), so the
+reply is a plain ``json.loads``. Everything else, and any reply that isn't
+valid JSON, goes through ``parse_markers``: one pass of a compiled regex
+over the FEEDBACK: / NEXT_QUESTION: style lines the prompts describe. Only
+the exact upper-case markers of the fields that reply type expects start a
+section (markdown emphasis and bullets around them are tolerated), so a
+line like "Question: you mentioned X" stays part of the feedback. The same
+pattern parses streamed replies (interview.FeedbackStreamParser, through
+``marker_pattern``), follow-up questions and batched openers (api/openers.py).
+
+``parse`` counts every reply in mockmate_model_replies_parsed_total by
+outcome: json, markers, partial (some fields missing) or failed (nothing
+usable, the caller's defaults are used).
+"""
+import re
+import json
+from functools import lru_cache
+
+from django.conf import settings
+
+from . import metrics
+
+SCHEMAS = {
+    "opening": ("greeting", "question"),
+    "answer": ("feedback", "next_question"),
+    "audio_answer": ("transcript", "feedback", "next_question"),
+    "feedback": ("feedback",),
+}
+
+MARKERS = ("greeting", "question", "feedback", "next_question", "transcript")
+
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.I)
+
+# Bullet, numbering and emphasis allowed before a marker name
+_LEAD = r"[ \t]*(?:[-*>#]+[ \t]*|\d+[.)][ \t]*)?\**[ \t]*"
+_LEAD_RE = re.compile(_LEAD)
+
+
+@lru_cache(maxsize=None)
+def _marker(fields):
+    """Regex for the marker lines of ``fields``, e.g. FEEDBACK: or **NEXT_QUESTION:**"""
+    names = "|".join(field.upper() for field in sorted(fields, key=len, reverse=True))
+    return re.compile(
+        rf"^{_LEAD}({names})"
+        r"[ \t]*\**[ \t]*:[ \t]*\**",
+        re.M,
+    )
+
+
+def generation_config(kind):
+    """JSON response schema for a reply kind, or None for the marker format"""
+    if not settings.STRUCTURED_OUTPUT:
+        return None
+    fields = SCHEMAS[kind]
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": {
+            "type": "object",
+            "properties": {field: {"type": "string"} for field in fields},
+            "required": list(fields),
+        },
+    }
+
+
+def _clean(text):
+    return " ".join(text.split()).strip("*").strip()
+
+
+def marker_pattern(fields=MARKERS):
+    """The compiled marker regex for ``fields`` (also used to parse streamed replies)"""
+    return _marker(tuple(fields))
+
+
+def could_start_marker(line, fields=MARKERS):
+    """True while an unfinished line could still turn into a marker of ``fields``"""
+    rest = line[_LEAD_RE.match(line).end():]
+    if rest.isdigit():
+        return True  # "1" of "1. FEEDBACK:"
+    for name in (field.upper() for field in fields):
+        if name.startswith(rest) or (rest.startswith(name) and not rest[len(name):].strip(" \t*")):
+            return True
+    return False
+
+
+def iter_markers(text, fields=MARKERS):
+    """Yield (field, body) for each marker line of ``fields``, in order"""
+    matches = list(_marker(tuple(fields)).finditer(text))
+    for match, following in zip(matches, matches[1:] + [None]):
+        body = text[match.end():following.start() if following else len(text)]
+        yield match.group(1).lower(), _clean(body)
+
+
+def parse_markers(text, fields=MARKERS):
+    """First non-empty body per field"""
+    found = {}
+    for field, body in iter_markers(text, fields):
+        if body and field not in found:
+            found[field] = body
+    return found
+
+
+def parse_json(text):
+    """The reply as a dict with lower-case keys, None if it isn't a JSON object"""
+    text = _FENCE.sub("", text.strip())
+    if not text.startswith("{"):
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return {str(key).lower(): value for key, value in data.items()}
+
+
+def parse(kind, text):
+    """Extract the fields of ``kind`` from a reply; missing fields are ''"""
+    fields = SCHEMAS[kind]
+    data = parse_json(text)
+    outcome = "json"
+    if data is None:
+        data = parse_markers(text, fields)
+        outcome = "markers"
+    result = {field: _clean(str(data.get(field) or "")) for field in fields}
+
+    found = sum(1 for value in result.values() if value)
+    if not found:
+        outcome = "failed"
+    elif found < len(fields):
+        outcome = "partial"
+    metrics.PARSED_REPLIES.inc(kind=kind, outcome=outcome)
+    return result
+
+
+def evaluation_config():
+    """JSON array schema for batch evaluation replies (manage.py batch_evaluate)"""
+    if not settings.STRUCTURED_OUTPUT:
+        return None
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "score": {"type": "integer"},
+                    "feedback": {"type": "string"},
+                },
+                "required": ["id", "score", "feedback"],
+            },
+        },
+    }
+
+
+def parse_evaluations(text, count):
+    """{answer number: (score, feedback)} from a batch evaluation reply; missing answers are left out"""
+    try:
+        data = json.loads(_FENCE.sub("", text.strip()))
+    except ValueError:
+        data = None
+    results = {}
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            number, score = int(item.get("id")), int(item.get("score"))
+        except (TypeError, ValueError):
+            continue
+        if 1 <= number <= count and number not in results:
+            results[number] = (max(1, min(10, score)), _clean(str(item.get("feedback") or "")))
+
+    if not results:
+        outcome = "failed"
+    elif len(results) < count:
+        outcome = "partial"
+    else:
+        outcome = "json"
+    metrics.PARSED_REPLIES.inc(kind="batch_evaluation", outcome=outcome)
+    return results
+
+
+def parse_questions(text):
+    """QUESTION: bodies in order (follow-up and batched opener replies)"""
+    return [body for field, body in iter_markers(text, ("question",)) if body]
+
+
+def parse_openers(text):
+    """(greeting, question) pairs in order from a batched opener reply"""
+    pairs, greeting = [], None
+    for field, body in iter_markers(text, ("greeting", "question")):
+        if field == "greeting":
+            greeting = body
+        elif greeting and body:
+            pairs.append((greeting, body))
+            greeting = None
+    metrics.PARSED_REPLIES.inc(kind="batch_opening", outcome="markers" if pairs else "failed")
+    return pairs
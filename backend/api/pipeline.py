@@ -0,0 +1,131 @@
+"""
+Answer pipelines for submit_answer.
+
+ANSWER_PIPELINE selects how an uploaded answer becomes feedback and the
+next question:
+
+- "serial" (default): transcribe, then one interviewer call (see views.py).
+- "multimodal": a single Gemini call receives the audio together with the
+  conversation and returns TRANSCRIPT / FEEDBACK / NEXT_QUESTION, saving a
+  full model round trip.
+- "concurrent": the next question is generated from the conversation so far
+  while the answer is being transcribed; only the (short) feedback call
+  waits for the transcript. The next question can't react to the answer
+  itself, which is the trade-off for the lower latency.
+
+Both apply to whole uploads only. Answers streamed through answer/chunk/
+are already transcribed when answer/ is called and stay serial, and
+"multimodal" falls back to "concurrent" when Gemini isn't the transcription
+backend.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import interview, context, llm, parsing, prefetch
+from .transcription import get_transcriber
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="answer")
+
+
+def mode():
+    """The pipeline to use for whole uploads"""
+    if settings.ANSWER_PIPELINE == "multimodal" and settings.TRANSCRIPTION_BACKEND != "gemini":
+        return "concurrent"
+    return settings.ANSWER_PIPELINE
+
+
+def _with_answer(session, transcript):
+    """Copy of the session with the answer appended, leaving the original untouched"""
+    answered = dict(session, conversation_history=list(session["conversation_history"]))
+    interview.record_answer(answered, transcript)
+    return answered
+
+
+def _audio_contents(session, audio_bytes, mime_type):
+    return interview.audio_answer_contents(
+        session["topic"], context.build_context(session), session["question_count"], audio_bytes, mime_type
+    )
+
+
+def _next_question_prompt(session):
+    return interview.follow_up_prompt(session["topic"], context.build_context(session), 1)
+
+
+def _feedback_prompt(session, transcript):
+    answered = _with_answer(session, transcript)
+    return interview.feedback_prompt(session["topic"], context.build_context(answered), session["question_count"])
+
+
+def _first_question(ai_response):
+    questions = interview.parse_questions(ai_response)
+    return questions[0] if questions else interview.DEFAULT_NEXT_QUESTION
+
+
+def run(session, audio_bytes, mime_type, candidates=None):
+    """
+    Return (transcript, feedback, next_question) for an answer that hasn't
+    been recorded on the session yet. feedback and next_question are None
+    when the transcript isn't usable.
+    """
+    if mode() == "multimodal":
+        response = llm.generate(_audio_contents(session, audio_bytes, mime_type), parsing.generation_config("audio_answer"))
+        return interview.parse_audio_answer(response.text.strip())
+
+    # Prefetched follow-ups were generated from the same context, so a hit
+    # makes the next-question call unnecessary
+    question = None if candidates else _executor.submit(_generate_next_question, session)
+    try:
+        transcript = get_transcriber().transcribe(audio_bytes, mime_type)
+    except Exception:
+        if question:
+            question.cancel()
+        raise
+    if not interview.is_usable_transcript(transcript):
+        if question:
+            question.cancel()
+        return transcript, None, None
+    response = llm.generate(_feedback_prompt(session, transcript), parsing.generation_config("feedback"))
+    feedback = interview.parse_feedback_only(response.text.strip())
+    return transcript, feedback, prefetch.choose(candidates) if candidates else question.result()
+
+
+def _generate_next_question(session):
+    return _first_question(llm.generate(_next_question_prompt(session)).text)
+
+
+async def arun(session, audio_bytes, mime_type, candidates=None):
+    """Async version of run(); the concurrent stages are gathered on the event loop"""
+    if mode() == "multimodal":
+        response = await llm.agenerate(_audio_contents(session, audio_bytes, mime_type), parsing.generation_config("audio_answer"))
+        return interview.parse_audio_answer(response.text.strip())
+
+    async def transcribe_and_review():
+        transcript = await get_transcriber().atranscribe(audio_bytes, mime_type)
+        if not interview.is_usable_transcript(transcript):
+            return transcript, None
+        response = await llm.agenerate(_feedback_prompt(session, transcript), parsing.generation_config("feedback"))
+        return transcript, interview.parse_feedback_only(response.text.strip())
+
+    if candidates:
+        transcript, feedback = await transcribe_and_review()
+        return transcript, feedback, prefetch.choose(candidates) if feedback else None
+
+    async def next_question():
+        response = await llm.agenerate(_next_question_prompt(session))
+        return _first_question(response.text)
+
+    question = asyncio.ensure_future(next_question())
+    try:
+        transcript, feedback = await transcribe_and_review()
+    except Exception:
+        question.cancel()
+        raise
+    if feedback is None:
+        question.cancel()
+        return transcript, None, None
+    return transcript, feedback, await question
@@ -0,0 +1,133 @@
+"""
+Speculative next-question prefetch.
+
+While the candidate is answering, a background thread asks the model for a
+few likely follow-up questions and parks them in the shared cache under the
+current question_id. When the answer arrives, submit_answer only needs a
+short feedback generation that picks one of them by number.
+
+Enable with PREFETCH_ENABLED=True. ``get_stats()`` reports hit rate and the
+tokens spent on prefetches that were never used: ones that were never
+taken, and ones where the model wrote its own next question instead.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from . import interview, context, llm
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+
+KEY_PREFIX = "interview:prefetch:"
+
+
+class PrefetchStats:
+    """Per-worker prefetch counters"""
+
+    def __init__(self):
+        self.generated = 0
+        self.hits = 0
+        self.misses = 0
+        self.chosen = 0  # hits where the model picked a prefetched question
+        self.tokens_generated = 0
+        self.tokens_used = 0
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "generated": self.generated,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "chosen": self.chosen,
+                "tokens_generated": self.tokens_generated,
+                "wasted_tokens": self.tokens_generated - self.tokens_used,
+            }
+
+
+stats = PrefetchStats()
+
+
+class Candidates(list):
+    """Prefetched questions, with the output tokens they cost"""
+
+    def __init__(self, questions, tokens=0):
+        super().__init__(questions)
+        self.tokens = tokens
+
+
+def get_stats():
+    return stats.as_dict()
+
+
+def _cache():
+    return caches[settings.PREFETCH_CACHE_ALIAS]
+
+
+def schedule(session_id, question_id, session):
+    """Start generating follow-up candidates for ``question_id`` in the background"""
+    if not settings.PREFETCH_ENABLED:
+        return
+    prompt = interview.follow_up_prompt(session["topic"], context.build_context(session), settings.PREFETCH_CANDIDATES)
+    _executor.submit(_generate, question_id, prompt)
+
+
+def _generate(question_id, prompt):
+    try:
+        response = llm.generate(prompt)
+        candidates = interview.parse_questions(response.text)[:settings.PREFETCH_CANDIDATES]
+        if not candidates:
+            return
+        usage = getattr(response, "usage_metadata", None)
+        tokens = getattr(usage, "candidates_token_count", 0) or 0
+        stats.add(generated=1, tokens_generated=tokens)
+        _cache().set(KEY_PREFIX + question_id, {"candidates": candidates, "tokens": tokens}, timeout=settings.PREFETCH_TTL)
+    except Exception as e:
+        logger.warning(f"Prefetch for {question_id} failed: {e}")
+    finally:
+        connections.close_all()
+
+
+def take(question_id):
+    """Pop the prefetched candidates for a question (None on a miss)"""
+    if not settings.PREFETCH_ENABLED:
+        return None
+    entry = _cache().get(KEY_PREFIX + question_id)
+    if entry is None:
+        stats.add(misses=1)
+        return None
+    _cache().delete(KEY_PREFIX + question_id)
+    stats.add(hits=1)
+    return Candidates(entry["candidates"], entry["tokens"])
+
+
+async def atake(question_id):
+    return await sync_to_async(take)(question_id)
+
+
+def choose(candidates, index=0):
+    """Use a prefetched question; only now do its tokens count as used"""
+    stats.add(chosen=1, tokens_used=getattr(candidates, "tokens", 0))
+    return candidates[index]
+
+
+def resolve(next_question, candidates):
+    """Map a numeric NEXT_QUESTION choice back to the prefetched question"""
+    choice = next_question.strip().rstrip(".")
+    if choice.isdigit() and 1 <= int(choice) <= len(candidates):
+        return choose(candidates, int(choice) - 1)
+    return next_question
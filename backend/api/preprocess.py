@@ -0,0 +1,169 @@
+"""
+Answer audio preprocessing before transcription (AUDIO_PREPROCESS).
+
+Browsers upload 48 kHz WebM/Opus with the silence before and after the
+answer included, and Gemini bills audio per second. Before any upstream
+call, ``prepare``:
+
+1. decodes the upload to 16 kHz mono PCM (api/audio.py: ffmpeg downmixes
+   and resamples; WAV read directly is resampled here)
+2. runs a vectorized energy VAD over 30 ms frames: a frame is speech when
+   its RMS level is above AUDIO_VAD_FLOOR_DBFS and either
+   AUDIO_VAD_MARGIN_DB above the clip's noise floor or louder than
+   AUDIO_VAD_SPEECH_DBFS (continuous loud speech has no quiet frames to
+   measure a noise floor from)
+3. rejects clips with less than AUDIO_MIN_SPEECH_MS of speech
+   (NoSpeechError), so silent answers fail instantly and cost nothing;
+   audible clips whose level barely varies (less than the margin) can't be
+   told apart from noise by energy, so they go to the transcriber untrimmed
+4. trims leading and trailing silence, keeping AUDIO_VAD_PADDING_MS
+5. re-encodes as low-bitrate Ogg/Opus through an ffmpeg pipe, or 16 kHz
+   mono WAV when ffmpeg can't, whichever is smaller than the upload. Vosk
+   transcribes PCM, so for it the trimmed samples go out as WAV, which it
+   reads back without starting ffmpeg again
+
+Uploads that can't be decoded are passed through unchanged and left to the
+transcription backend. Without ffmpeg most uploads can't be decoded at all,
+so ``enabled()`` turns preprocessing off, with one warning, when the binary
+is missing.
+"""
+import io
+import wave
+import logging
+import subprocess
+
+import numpy as np
+from django.conf import settings
+
+from . import metrics
+from .audio import decode_to_pcm, ffmpeg_available, AudioDecodeError, SAMPLE_RATE, FFMPEG_BINARY
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 30
+
+_ffmpeg = None
+
+
+class NoSpeechError(Exception):
+    """Raised when an answer recording contains no speech"""
+
+
+def enabled():
+    """AUDIO_PREPROCESS, unless ffmpeg is missing (checked once per process)"""
+    global _ffmpeg
+    if not settings.AUDIO_PREPROCESS:
+        return False
+    if _ffmpeg is None:
+        _ffmpeg = ffmpeg_available()
+        if not _ffmpeg:
+            logger.warning(f"{FFMPEG_BINARY} not found, answer audio preprocessing is off")
+    return _ffmpeg
+
+
+def resample(samples, rate, target=SAMPLE_RATE):
+    """Linear-interpolation resample of int16 samples"""
+    if rate == target or not len(samples):
+        return samples
+    count = int(round(len(samples) * target / rate))
+    positions = np.arange(count) * (rate / target)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+
+
+def frame_levels(samples, rate=SAMPLE_RATE):
+    """RMS level in dBFS of each FRAME_MS frame, and the frame length"""
+    frame = rate * FRAME_MS // 1000
+    count = len(samples) // frame
+    if not count:
+        return np.zeros(0, dtype=np.float32), frame
+    frames = samples[:count * frame].astype(np.float32).reshape(count, frame) / 32768.0
+    return 20 * np.log10(np.sqrt(np.mean(frames * frames, axis=1)) + 1e-10), frame
+
+
+def _voiced(level):
+    if not len(level):
+        return np.zeros(0, dtype=bool)
+    relative = np.percentile(level, 10) + settings.AUDIO_VAD_MARGIN_DB
+    loud = (level > relative) | (level > settings.AUDIO_VAD_SPEECH_DBFS)
+    return loud & (level > settings.AUDIO_VAD_FLOOR_DBFS)
+
+
+def voiced_frames(samples, rate=SAMPLE_RATE):
+    """Boolean speech mask with one entry per FRAME_MS frame, and the frame length"""
+    level, frame = frame_levels(samples, rate)
+    return _voiced(level), frame
+
+
+def trim_silence(samples, rate=SAMPLE_RATE):
+    """Samples from the first to the last speech frame (plus padding); NoSpeechError if too little speech"""
+    level, frame = frame_levels(samples, rate)
+    voiced = _voiced(level)
+    speech_ms = int(voiced.sum()) * FRAME_MS
+    if speech_ms < settings.AUDIO_MIN_SPEECH_MS:
+        low, high = np.percentile(level, [10, 90]) if len(level) else (-np.inf, -np.inf)
+        if high > settings.AUDIO_VAD_FLOOR_DBFS and high - low < settings.AUDIO_VAD_MARGIN_DB:
+            # Audible but flat: energy can't separate speech from noise here
+            return samples
+        raise NoSpeechError(f"{speech_ms} ms of speech")
+    indexes = np.flatnonzero(voiced)
+    padding = settings.AUDIO_VAD_PADDING_MS // FRAME_MS
+    start = max(0, indexes[0] - padding) * frame
+    end = min(len(voiced), indexes[-1] + padding + 1) * frame
+    return samples[start:end]
+
+
+def encode_opus(pcm, rate=SAMPLE_RATE):
+    """Mono 16-bit PCM to Ogg/Opus bytes, None when ffmpeg isn't available or fails"""
+    cmd = [
+        FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+        "-f", "s16le", "-ar", str(rate), "-ac", "1", "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", settings.AUDIO_OPUS_BITRATE, "-application", "voip",
+        "-f", "ogg", "pipe:1",
+    ]
+    try:
+        return subprocess.run(cmd, input=pcm, capture_output=True, check=True).stdout or None
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.debug(f"Opus encoding unavailable: {e}")
+        return None
+
+
+def encode_wav(pcm, rate=SAMPLE_RATE):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def prepare(audio_bytes, mime_type):
+    """Return (audio_bytes, mime_type) to transcribe; raises NoSpeechError for silent clips"""
+    try:
+        pcm, rate = decode_to_pcm(audio_bytes)
+    except (AudioDecodeError, OSError) as e:
+        logger.warning(f"Skipping audio preprocessing, could not decode upload: {e}")
+        metrics.AUDIO_PREPROCESSED.inc(outcome="undecodable")
+        return audio_bytes, mime_type
+
+    samples = resample(np.frombuffer(pcm, dtype="<i2"), rate)
+    try:
+        speech = trim_silence(samples).astype("<i2").tobytes()
+    except NoSpeechError:
+        metrics.AUDIO_PREPROCESSED.inc(outcome="silent")
+        raise
+
+    if settings.TRANSCRIPTION_BACKEND == "vosk":
+        metrics.AUDIO_PREPROCESSED.inc(outcome="pcm")
+        return encode_wav(speech), "audio/wav"
+
+    encoded = encode_opus(speech)
+    if encoded:
+        outcome, prepared = "opus", (encoded, "audio/ogg")
+    else:
+        outcome, prepared = "wav", (encode_wav(speech), "audio/wav")
+    if len(prepared[0]) >= len(audio_bytes):
+        outcome, prepared = "original", (audio_bytes, mime_type)
+    metrics.AUDIO_PREPROCESSED.inc(outcome=outcome)
+    logger.debug(f"Preprocessed answer audio: {len(audio_bytes)} -> {len(prepared[0])} bytes ({outcome})")
+    return prepared
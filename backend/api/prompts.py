@@ -0,0 +1,186 @@
+"""
+Prompt templates laid out for provider-side prefix caching.
+
+The interviewer rules that used to be repeated (with the topic spliced into
+them) in every prompt are one topic-independent ``SYSTEM_INSTRUCTION``,
+which ``llm.get_model()`` gives every interview call. The request text is
+then ordered from most to least stable:
+
+    INTERVIEW TOPIC: <topic>               same for the whole interview
+    CONVERSATION SO FAR: <context>         only grows between turns
+    TASK: <what to do with this turn>      the only part that changes
+
+so consecutive calls for one interview share everything up to the task,
+and Gemini's implicit caching can skip re-processing it. The task templates
+are ``string.Template`` sources compiled once per topic (``for_topic``,
+an LRU of PROMPT_TOPICS_CACHED topics).
+
+Explicit context caches aren't used: the shared system instruction is a
+few hundred tokens, well under the provider's minimum cached content size.
+Implicit cache hits reported by Gemini are counted in
+mockmate_llm_tokens_total{kind="cached"}.
+"""
+import string
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+SYSTEM_INSTRUCTION = """You are a professional technical interviewer conducting an oral interview. \
+Every request names the interview topic, gives the conversation so far and ends with a TASK.
+
+Interview rules:
+- Ask ONLY oral/discussion questions that can be answered by speaking
+- NO coding questions, NO "write code", NO algorithms to implement
+- NO whiteboard problems, NO diagrams, NO technical writing
+- Focus on concepts, experience, methodologies, best practices and problem-solving approaches
+- Questions should require only verbal explanations
+
+Feedback rules:
+- Feedback is SHORT and specific: 2-3 sentences maximum
+- Briefly mention what the candidate got right
+- Point out one key area for improvement if needed
+- Be encouraging but brief and conversational; focus on key points only
+
+Greetings are extremely short: just "Hi, I am your interviewer" or "Hello, I am your interviewer".
+
+Follow the output format given in the TASK exactly and add nothing else."""
+
+TEMPLATES = {
+    "opening": """Generate the first question for this oral interview. Format your response as:
+GREETING: [Very brief greeting - just "Hi, I am your interviewer" or "Hello, I am your interviewer let's start"]
+QUESTION: [Your oral/conceptual question about $topic that requires only speaking to answer]
+
+Keep the greeting extremely short and ask only discussion-based questions.""",
+
+    "batch_opening": """Generate the first question for this oral interview. Format your response as:
+GREETING: [Very brief greeting - just "Hi, I am your interviewer" or "Hello, I am your interviewer let's start"]
+QUESTION: [Your oral/conceptual question about $topic that requires only speaking to answer]
+
+Generate $count DIFFERENT openers for separate candidates. Vary the question
+each time (different concepts, experience and best-practice angles). Output
+each opener in the format above, one after another, nothing else.""",
+
+    "answer": """The candidate just answered question $number. Give your feedback on the answer,
+then ask your next ORAL question about $topic.
+
+Format your response as:
+FEEDBACK: [Your SHORT feedback (2-3 sentences max) - be concise and specific]
+NEXT_QUESTION: [Your next ORAL question about $topic concepts/experience]""",
+
+    "answer_choice": """The candidate just answered question $number. Give your feedback on the answer,
+then choose the best next question from the candidates below.
+
+CANDIDATE NEXT QUESTIONS:
+$options
+
+Format your response as:
+FEEDBACK: [Your SHORT feedback (2-3 sentences max) - be concise and specific]
+NEXT_QUESTION: [ONLY the number of the best candidate; write a new ORAL question about $topic only if none fits the answer]""",
+
+    "follow_up": """The candidate is now answering the last question. Propose $count different
+follow-up ORAL questions about $topic you could ask next, whatever their answer.
+
+Output exactly $count lines, each formatted as:
+QUESTION: [question]""",
+
+    "feedback": """The candidate just answered question $number. Give your feedback on the answer only;
+the next question is chosen separately.
+
+Format your response as:
+FEEDBACK: [Your SHORT feedback]""",
+
+    "audio_answer": """The attached audio is the candidate's spoken answer to question $number.
+
+1. Transcribe the audio exactly as spoken
+2. Give your feedback on the answer
+3. Ask your next ORAL question about $topic
+
+Format your response as:
+TRANSCRIPT: [the spoken words only; leave empty if there is no clear speech]
+FEEDBACK: [Your SHORT feedback (2-3 sentences max)]
+NEXT_QUESTION: [Your next ORAL question about $topic]""",
+
+    "summary": """The interview is over. Provide a CONCISE final evaluation of this oral $topic interview,
+keeping each section short:
+1. Overall Performance (2-3 sentences)
+2. Technical Knowledge (2-3 sentences)
+3. Communication Skills (2-3 sentences)
+4. Key Strengths (1-2 sentences)
+5. Areas for Improvement (1-2 sentences)
+6. Final Recommendation (1-2 sentences)
+
+Be professional and concise. Focus on the most important points only. Keep the entire evaluation under 200 words.""",
+
+    "batch_evaluation": """Score each numbered answer below. They were recorded in separate $topic interviews,
+so judge each one on its own. Give a score from 1 (poor) to 10 (excellent) and SHORT
+feedback (2-3 sentences max) on what was right and the key area to improve.
+
+$answers
+
+Return a JSON array with one object per answer, in order:
+[{"id": <answer number>, "score": <1-10>, "feedback": "<feedback>"}]""",
+
+    "fold": """Update the running summary of this interview with the new turns below. Keep the
+questions asked, how well the candidate answered each one and any notable strengths
+or gaps. Stay under $words words. Return only the updated summary.
+
+CURRENT SUMMARY:
+$summary
+
+NEW TURNS:
+$turns""",
+}
+
+
+class TopicPrompts:
+    """Every template with the topic substituted, compiled once"""
+
+    def __init__(self, topic):
+        self.topic = topic
+        self.header = f"INTERVIEW TOPIC: {topic}\n\n"
+        literal_topic = topic.replace("$", "$$")
+        self.tasks = {
+            kind: string.Template(string.Template(source).safe_substitute(topic=literal_topic))
+            for kind, source in TEMPLATES.items()
+        }
+
+    def parts(self, kind, conversation=None, **fields):
+        """(stable prefix, task) for one call"""
+        prefix = self.header
+        if conversation is not None:
+            prefix += f"CONVERSATION SO FAR:\n{conversation}\n"
+        return prefix, "TASK:\n" + self.tasks[kind].substitute(fields)
+
+    def render(self, kind, conversation=None, **fields):
+        return "".join(self.parts(kind, conversation, **fields))
+
+
+_topics = OrderedDict()
+_topics_lock = threading.Lock()
+
+
+def for_topic(topic):
+    """The compiled templates for a topic (LRU of PROMPT_TOPICS_CACHED)"""
+    with _topics_lock:
+        prompts = _topics.get(topic)
+        if prompts is None:
+            prompts = _topics[topic] = TopicPrompts(topic)
+            while len(_topics) > settings.PROMPT_TOPICS_CACHED:
+                _topics.popitem(last=False)
+        else:
+            _topics.move_to_end(topic)
+        return prompts
+
+
+def render(kind, topic, conversation=None, **fields):
+    return for_topic(topic).render(kind, conversation, **fields)
+
+
+def parts(kind, topic, conversation=None, **fields):
+    return for_topic(topic).parts(kind, conversation, **fields)
+
+
+def stats():
+    with _topics_lock:
+        return {"topics_compiled": len(_topics)}
@@ -0,0 +1,116 @@
+"""
+Idempotent replays for retried requests.
+
+Flaky clients retry submit_answer and end_interview. Each computed reply is
+stored under an idempotency key derived from the request:
+
+- answers: session_id, the interview's nonce, question_id and a SHA-256 of
+  the audio (or "chunked" for recordings uploaded through answer/chunk/)
+- summaries: session_id and the interview's nonce
+
+The nonce is minted per interview (interview.new_session), so a reply is
+only ever replayed to the interview it was computed for. Ending an
+interview keeps a small ended marker with the nonce in place of the
+session, which is how a retried end/ call finds its summary.
+
+A retry with the same key gets the stored reply back without another model
+call and without recording the answer twice. Replies are kept in a small
+per-worker LRU in front of the shared cache (REPLAY_CACHE_ALIAS), so a retry
+that lands on the same worker never leaves the process.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+from . import interview
+from .lru import BoundedTTLCache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "interview:reply:"
+REPLAY_HEADER = "Idempotent-Replay"
+
+
+def answer_key(session_id, nonce, question_id, audio_bytes):
+    digest = hashlib.sha256(audio_bytes).hexdigest()[:32] if audio_bytes is not None else "chunked"
+    return f"{KEY_PREFIX}{session_id}:{nonce}:{question_id}:{digest}"
+
+
+def end_key(session_id, nonce):
+    return f"{KEY_PREFIX}{session_id}:{nonce}:end"
+
+
+class ReplayCache:
+    """Stored replies: per-worker LRU backed by a shared Django cache"""
+
+    def __init__(self, cache_alias="interviews", ttl=600, local_entries=1000):
+        self.cache_alias = cache_alias
+        self.ttl = ttl
+        self.local = BoundedTTLCache(max_entries=local_entries, max_bytes=16 * 1024 * 1024, ttl=ttl)
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def get(self, key):
+        payload = self.local.get(key)
+        if payload is None:
+            payload = self.shared.get(key)
+            if payload is not None:
+                self.local.set(key, payload)
+        return payload
+
+    def set(self, key, payload):
+        self.local.set(key, payload)
+        self.shared.set(key, payload, timeout=self.ttl)
+
+    async def aget(self, key):
+        payload = self.local.get(key)
+        if payload is None:
+            payload = await self.shared.aget(key)
+            if payload is not None:
+                self.local.set(key, payload)
+        return payload
+
+    async def aset(self, key, payload):
+        self.local.set(key, payload)
+        await self.shared.aset(key, payload, timeout=self.ttl)
+
+    def stats(self):
+        return self.local.stats()
+
+
+def replayed(key, payload):
+    """JsonResponse for a stored reply"""
+    logger.info(f"Replaying stored reply for {key}")
+    response = JsonResponse(payload)
+    response[REPLAY_HEADER] = "true"
+    return response
+
+
+def replayed_events(payload):
+    """SSE events for a stored answer, in the order a live stream sends them"""
+    return [
+        interview.sse_event("transcript", {"transcript": payload["transcript"]}),
+        interview.sse_event("feedback", {"delta": payload["feedback"]}),
+        interview.sse_event("next_question", {"delta": payload["next_question"]}),
+        interview.sse_event("done", payload),
+    ]
+
+
+_replies = None
+
+
+def get_replay_cache():
+    """Return this worker's replay cache"""
+    global _replies
+    if _replies is None:
+        _replies = ReplayCache(
+            cache_alias=settings.REPLAY_CACHE_ALIAS,
+            ttl=settings.REPLAY_TTL,
+            local_entries=settings.REPLAY_LOCAL_ENTRIES,
+        )
+    return _replies
@@ -0,0 +1,282 @@
+"""
+Interview session storage.
+
+Sessions used to live in a module-level dict in ``api/views.py``, which only
+works with a single worker process. The store here is pluggable through
+``settings.INTERVIEW_SESSION_STORE`` so every gunicorn worker (and every node)
+sees the same interviews.
+"""
+import time
+import uuid
+import pickle
+import logging
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connections, router
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .lru import BoundedTTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class SessionLockTimeout(Exception):
+    """Raised when a session lock could not be acquired in time"""
+
+
+class BaseSessionStore:
+    """
+    Interface every session backend implements.
+
+    ``ttl`` is a sliding expiry in seconds: each ``save`` pushes it forward,
+    so abandoned interviews disappear on their own.
+    """
+
+    def __init__(self, ttl=7200, lock_timeout=120, lock_wait=60, **options):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+
+    def get(self, session_id):
+        raise NotImplementedError
+
+    def save(self, session_id, session):
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        raise NotImplementedError
+
+    def _add(self, session_id, session):
+        """Store ``session`` only if ``session_id`` is unused; True when stored"""
+        raise NotImplementedError
+
+    def create(self, session):
+        """
+        Store a new interview under a fresh server-generated ID and return it.
+
+        IDs are random UUIDs, never taken from the client, and ``_add`` is
+        atomic, so a new interview can't overwrite or attach to another one.
+        """
+        while True:
+            session_id = uuid.uuid4().hex
+            if self._add(session_id, session):
+                return session_id
+
+    def stats(self):
+        """Backend-specific counters, empty when the backend keeps none"""
+        return {}
+
+    def _acquire(self, session_id, token):
+        raise NotImplementedError
+
+    def _release(self, session_id, token):
+        raise NotImplementedError
+
+    @contextmanager
+    def lock(self, session_id):
+        """Hold an exclusive lock on a session while it is read and updated"""
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_wait
+        delay = 0.02
+        while not self._acquire(session_id, token):
+            if time.monotonic() >= deadline:
+                raise SessionLockTimeout(f"Session {session_id} is busy")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+        try:
+            yield
+        finally:
+            self._release(session_id, token)
+
+    # Async variants for the ASGI views. Backends are synchronous (Django's
+    # cache API), so each call is handed off to a worker thread.
+
+    async def aget(self, session_id):
+        return await sync_to_async(self.get)(session_id)
+
+    async def asave(self, session_id, session):
+        await sync_to_async(self.save)(session_id, session)
+
+    async def acreate(self, session):
+        return await sync_to_async(self.create)(session)
+
+    async def adelete(self, session_id):
+        await sync_to_async(self.delete)(session_id)
+
+    @asynccontextmanager
+    async def alock(self, session_id):
+        """Like ``lock`` but waits with ``asyncio.sleep`` instead of blocking"""
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_wait
+        delay = 0.02
+        while not await sync_to_async(self._acquire)(session_id, token):
+            if time.monotonic() >= deadline:
+                raise SessionLockTimeout(f"Session {session_id} is busy")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+        try:
+            yield
+        finally:
+            await sync_to_async(self._release)(session_id, token)
+
+
+class CacheSessionStore(BaseSessionStore):
+    """
+    Session store on top of a Django cache alias.
+
+    Point the alias at the database cache (default) or Redis/Memcached to
+    share sessions between workers and nodes. Locks use ``cache.add`` which
+    is atomic on all of those backends.
+    """
+
+    key_prefix = "interview:session:"
+    lock_prefix = "interview:lock:"
+
+    def __init__(self, cache_alias="default", **options):
+        super().__init__(**options)
+        self.cache = caches[cache_alias]
+        self._counts = {"created": 0, "hits": 0, "misses": 0, "saves": 0, "deletes": 0}
+        self._counts_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._counts_lock:
+            self._counts[name] += 1
+
+    def get(self, session_id):
+        session = self.cache.get(self.key_prefix + session_id)
+        self._count("hits" if session is not None else "misses")
+        return session
+
+    def save(self, session_id, session):
+        self.cache.set(self.key_prefix + session_id, session, timeout=self.ttl)
+        self._count("saves")
+
+    def delete(self, session_id):
+        self.cache.delete(self.key_prefix + session_id)
+        self._count("deletes")
+
+    def _add(self, session_id, session):
+        added = self.cache.add(self.key_prefix + session_id, session, timeout=self.ttl)
+        if added:
+            self._count("created")
+        return added
+
+    def stats(self):
+        """Per-worker operation counts, plus the stored sessions where the backend can count them"""
+        with self._counts_lock:
+            stats = dict(self._counts)
+        entries = self._entries()
+        if entries is not None:
+            stats["entries"] = entries
+        return stats
+
+    def _entries(self):
+        # Only the database cache can be counted without scanning every key
+        if not isinstance(self.cache, DatabaseCache):
+            return None
+        connection = connections[router.db_for_read(self.cache.cache_model_class)]
+        prefix = self.cache.make_and_validate_key(self.key_prefix)
+        pattern = prefix.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%"
+        table = connection.ops.quote_name(self.cache._table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE cache_key LIKE %s ESCAPE '!' AND expires > %s",
+                [pattern, connection.ops.adapt_datetimefield_value(timezone.now().replace(microsecond=0))],
+            )
+            return cursor.fetchone()[0]
+
+    def _acquire(self, session_id, token):
+        return self.cache.add(self.lock_prefix + session_id, token, timeout=self.lock_timeout)
+
+    def _release(self, session_id, token):
+        key = self.lock_prefix + session_id
+        # Only drop the lock if it is still ours; it may have expired and been
+        # taken over by another worker in the meantime.
+        if self.cache.get(key) == token:
+            self.cache.delete(key)
+
+
+class LocalMemorySessionStore(BaseSessionStore):
+    """
+    Per-process session store bounded by entry count and memory.
+
+    Abandoned interviews are dropped by TTL or LRU eviction instead of living
+    until the worker restarts. Sessions are pinned while their lock is held,
+    so an answer in flight never loses its session to eviction. Only suitable
+    for single-worker deployments (or with sticky routing).
+
+    Sessions are kept pickled, like in a shared cache: ``get`` returns a
+    copy, so a request that fails halfway leaves the stored session as it
+    was, and the pickle's length is the entry's size.
+    """
+
+    def __init__(self, max_entries=1000, max_bytes=64 * 1024 * 1024, **options):
+        super().__init__(**options)
+        self.cache = BoundedTTLCache(max_entries=max_entries, max_bytes=max_bytes, ttl=self.ttl, sizeof=len)
+        self._busy = set()
+        self._cond = threading.Condition()
+
+    def get(self, session_id):
+        data = self.cache.get(session_id)
+        return pickle.loads(data) if data is not None else None
+
+    def save(self, session_id, session):
+        self.cache.set(session_id, pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def delete(self, session_id):
+        self.cache.delete(session_id)
+
+    def _add(self, session_id, session):
+        return self.cache.add(session_id, pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def stats(self):
+        return self.cache.stats()
+
+    def _acquire(self, session_id, token):
+        with self._cond:
+            if session_id in self._busy:
+                return False
+            self._busy.add(session_id)
+        self.cache.pin(session_id)
+        return True
+
+    def _release(self, session_id, token):
+        self.cache.unpin(session_id)
+        with self._cond:
+            self._busy.discard(session_id)
+            self._cond.notify_all()
+
+    @contextmanager
+    def lock(self, session_id):
+        with self._cond:
+            if not self._cond.wait_for(lambda: session_id not in self._busy, timeout=self.lock_wait):
+                raise SessionLockTimeout(f"Session {session_id} is busy")
+            self._busy.add(session_id)
+        self.cache.pin(session_id)
+        try:
+            yield
+        finally:
+            self._release(session_id, None)
+
+
+_store = None
+
+
+def get_session_store():
+    """Return the configured session store, built once per process"""
+    global _store
+    if _store is None:
+        config = getattr(settings, "INTERVIEW_SESSION_STORE", {})
+        backend = import_string(config.get("BACKEND", "api.sessions.CacheSessionStore"))
+        options = {key.lower(): value for key, value in config.get("OPTIONS", {}).items()}
+        _store = backend(**options)
+        logger.info(f"Using {backend.__name__} for interview sessions")
+    return _store
@@ -0,0 +1,26 @@
+"""
+Per-connection SQLite tuning for the production profile (SQLITE_TUNING).
+
+WAL lets readers run alongside the single writer, synchronous=NORMAL is
+crash-safe under WAL while skipping an fsync per commit, and mmap plus a
+larger page cache keep hot pages (the interview cache table) out of
+read() calls. Applied from the connection_created signal, see api/apps.py.
+"""
+from django.conf import settings
+
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Apply the SQLITE_* pragmas to a new connection"""
+    if connection.vendor != "sqlite" or not settings.SQLITE_TUNING:
+        return
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    if synchronous not in SYNCHRONOUS_MODES:
+        synchronous = "NORMAL"
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_KB)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
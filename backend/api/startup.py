@@ -0,0 +1,137 @@
+"""
+Worker startup: optional warm-up and a startup-time report.
+
+Django loads the URLconf (and with it every view module) on the first
+request, and the Gemini SDK, the speech-to-text engine and its model are
+loaded on first use. With STARTUP_WARMUP=True ``warm_up()`` does all of
+that when the WSGI/ASGI application is created instead:
+
+- imports the URLconf and views
+- imports and configures the Gemini SDK and builds the default model
+  (no network connection is opened)
+- builds the transcriber, which loads the Vosk model when selected
+
+Under gunicorn with preload_app (gunicorn.conf.py) this runs once in the
+master before forking, so workers start with everything loaded and share
+those pages copy-on-write. Database connections opened while warming up
+are closed before the fork.
+
+``report()`` has the time from process start to the application being
+ready, split by phase; it is logged once per worker, returned by
+/api/test/ and exported as mockmate_startup_* metrics.
+"""
+import os
+import time
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_imported_at = time.time()
+_phases = {}
+_state = {"warmed_up": False, "preloaded": False, "app_ready_at": None, "forked_at": None, "worker_ready_at": None}
+
+
+def _process_started():
+    """Wall-clock start of this process (Linux /proc), or when this module was imported"""
+    try:
+        with open("/proc/self/stat") as f:
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return _imported_at
+
+
+_started_at = _process_started()
+
+
+@contextmanager
+def phase(name):
+    """Record how long a startup phase takes"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = _phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def warm_up():
+    """Load the URLconf, model clients and local models now (STARTUP_WARMUP)"""
+    if not settings.STARTUP_WARMUP or _state["warmed_up"]:
+        return
+    from django.db import connections
+    from django.urls import get_resolver
+    from . import llm
+    from .transcription import get_transcriber
+
+    with phase("urls"):
+        get_resolver().url_patterns
+    with phase("llm"):
+        try:
+            llm.warm_up()
+        except Exception as e:
+            logger.warning(f"Could not warm up the LLM client: {e}")
+    with phase("transcriber"):
+        try:
+            get_transcriber()
+        except Exception as e:
+            logger.warning(f"Could not warm up transcription: {e}")
+
+    # Connections must not be shared with forked workers
+    connections.close_all()
+    _state["warmed_up"] = True
+
+
+def application_ready():
+    """Called once the WSGI/ASGI application exists; warms up and logs the report"""
+    from . import preprocess
+    preprocess.enabled()  # looks for ffmpeg once, before the first answer
+    warm_up()
+    _state["app_ready_at"] = time.time()
+    logger.info(f"Application ready: {summary()}")
+
+
+def worker_forked(preloaded):
+    """gunicorn post_fork hook"""
+    _state["forked_at"] = time.time()
+    _state["preloaded"] = preloaded
+
+
+def worker_ready():
+    """gunicorn post_worker_init hook: the worker is about to accept requests"""
+    _state["worker_ready_at"] = time.time()
+    logger.info(f"Worker {os.getpid()} ready: {summary()}")
+
+
+def _ms(start, end):
+    return round((end - start) * 1000, 1) if start and end else None
+
+
+def report():
+    """
+    app_ready_ms: process start to application ready, in the process that
+    built it (the gunicorn master when preloaded). worker_ready_ms: fork to
+    accepting requests, for gunicorn workers.
+    """
+    return {
+        "preloaded": _state["preloaded"],
+        "warmed_up": _state["warmed_up"],
+        "app_ready_ms": _ms(_started_at, _state["app_ready_at"]),
+        "worker_ready_ms": _ms(_state["forked_at"], _state["worker_ready_at"]),
+        "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in _phases.items()},
+    }
+
+
+def summary():
+    data = report()
+    parts = [f"application ready {data['app_ready_ms']} ms after process start"]
+    if data["worker_ready_ms"] is not None:
+        parts.append(f"worker ready {data['worker_ready_ms']} ms after fork"
+                     f"{' (preloaded)' if data['preloaded'] else ''}")
+    if data["phases_ms"]:
+        parts.append(", ".join(f"{name} {ms} ms" for name, ms in data["phases_ms"].items()))
+    return "; ".join(parts)
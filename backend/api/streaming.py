@@ -0,0 +1,200 @@
+"""
+Incremental answer uploads.
+
+While the candidate is still speaking, the browser can POST recording chunks
+to ``answer/chunk/``. With the Vosk backend each chunk is piped through a
+long-running ffmpeg straight into a streaming recognizer, so by the time
+``answer/`` is called only the tail of the recording is left to decode. With
+other backends the chunks are buffered so the upload is already done.
+
+Chunk streams live in the worker process that received them: deployments
+with several workers need sticky routing for ``answer/chunk/`` and
+``answer/`` (clients can always fall back to uploading the whole recording).
+"""
+import time
+import logging
+import threading
+
+from django.conf import settings
+
+from . import metrics
+from .audio import SAMPLE_RATE, start_pcm_decoder, observe_duration
+from .transcription import get_transcriber
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkError(Exception):
+    """Raised for chunks that can't be accepted"""
+
+
+def expected_chunks(value):
+    """The optional ``chunks`` field of answer/: how many chunks were sent"""
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ChunkError("Invalid chunk count")
+
+
+class ChunkedAnswer:
+    """One answer being uploaded (and possibly recognized) chunk by chunk"""
+
+    READ_SIZE = 8000  # 4000 frames of 16-bit PCM
+
+    def __init__(self, mime_type, max_bytes, stream_recognition):
+        self.mime_type = mime_type
+        self.max_bytes = max_bytes
+        self.buffer = bytearray()
+        self.next_seq = 0
+        self.updated_at = time.monotonic()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._decoder = None
+        self._reader = None
+        self._recognizer = None
+        self._pcm_bytes = 0
+        if stream_recognition:
+            self._start_recognition()
+
+    def _start_recognition(self):
+        try:
+            from .utils import VoskStream
+            self._recognizer = VoskStream()
+            self._decoder = start_pcm_decoder()
+        except Exception as e:
+            logger.warning(f"Streaming recognition unavailable, buffering chunks instead: {e}")
+            self._recognizer = None
+            return
+        self._reader = threading.Thread(target=self._read_pcm, daemon=True)
+        self._reader.start()
+
+    def _read_pcm(self):
+        # Runs in its own thread: decoded PCM is recognized while more
+        # chunks are still being uploaded.
+        stdout = self._decoder.stdout
+        while True:
+            pcm = stdout.read(self.READ_SIZE)
+            if not pcm:
+                break
+            self._pcm_bytes += len(pcm)
+            self._recognizer.accept(pcm)
+
+    def append(self, seq, data):
+        """Add chunk ``seq``; chunks may arrive out of order or be retried"""
+        with self._lock:
+            self.updated_at = time.monotonic()
+            if seq < self.next_seq or seq in self._pending:
+                return  # duplicate delivery
+            if len(self.buffer) + len(data) + sum(map(len, self._pending.values())) > self.max_bytes:
+                raise ChunkError("Recording is too large")
+            self._pending[seq] = data
+            while self.next_seq in self._pending:
+                chunk = self._pending.pop(self.next_seq)
+                self.buffer.extend(chunk)
+                if self._decoder:
+                    self._feed_decoder(chunk)
+                self.next_seq += 1
+
+    def _feed_decoder(self, chunk):
+        try:
+            self._decoder.stdin.write(chunk)
+            self._decoder.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            # ffmpeg gave up on the stream; keep buffering and let finish()
+            # fall back to transcribing the whole recording
+            logger.warning("Streaming decoder exited early, falling back to buffered transcription")
+            self.abort()
+            self._decoder = None
+            self._recognizer = None
+
+    def missing(self, expected=None):
+        """The first chunk still missing (of ``expected`` when given), or None"""
+        with self._lock:
+            if self._pending or (expected is not None and self.next_seq < expected):
+                return self.next_seq
+            return None
+
+    def finish(self):
+        """Return the transcript once the last chunk has arrived"""
+        with self._lock:
+            if self._pending:
+                raise ChunkError(f"Missing chunk {self.next_seq}")
+            metrics.AUDIO_BYTES.observe(len(self.buffer))
+            if self._recognizer is not None:
+                start = time.perf_counter()
+                self._decoder.stdin.close()
+                self._reader.join()
+                self._decoder.wait()
+                transcript = self._recognizer.finish().strip()
+                observe_duration(self._pcm_bytes, SAMPLE_RATE)
+                logger.debug(f"Streamed transcription tail took {(time.perf_counter() - start) * 1000:.0f} ms")
+                if transcript:
+                    return transcript
+            # No streaming recognizer (or it heard nothing): transcribe the
+            # buffered recording with the regular backends
+            return get_transcriber().transcribe(bytes(self.buffer), self.mime_type)
+
+    def abort(self):
+        if self._decoder and self._decoder.poll() is None:
+            self._decoder.kill()
+            self._decoder.wait()
+
+
+class ChunkedUploadRegistry:
+    """Per-process map of (session_id, question_id) -> ChunkedAnswer"""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._answers = {}
+        self._lock = threading.Lock()
+
+    def append(self, session_id, question_id, seq, data, mime_type):
+        key = (session_id, question_id)
+        with self._lock:
+            self._expire()
+            answer = self._answers.get(key)
+            if answer is None:
+                answer = ChunkedAnswer(
+                    mime_type,
+                    max_bytes=settings.DATA_UPLOAD_MAX_MEMORY_SIZE,
+                    stream_recognition=settings.TRANSCRIPTION_BACKEND == "vosk",
+                )
+                self._answers[key] = answer
+        answer.append(seq, data)
+        return answer
+
+    def has(self, session_id, question_id):
+        with self._lock:
+            return (session_id, question_id) in self._answers
+
+    def finish(self, session_id, question_id, expected=None):
+        """
+        Transcribe a complete upload. With chunks still missing the upload
+        stays registered, so the client can send them and call answer/ again.
+        """
+        key = (session_id, question_id)
+        with self._lock:
+            answer = self._answers.get(key)
+            if answer is None:
+                raise ChunkError("No chunks uploaded for this question")
+            missing = answer.missing(expected)
+            if missing is not None:
+                raise ChunkError(f"Missing chunk {missing}")
+            del self._answers[key]
+        try:
+            return answer.finish()
+        finally:
+            answer.abort()
+
+    def _expire(self):
+        now = time.monotonic()
+        for key, answer in list(self._answers.items()):
+            if now - answer.updated_at > self.ttl:
+                logger.info(f"Dropping abandoned chunked upload {key}")
+                answer.abort()
+                del self._answers[key]
+
+
+chunked_uploads = ChunkedUploadRegistry()
@@ -0,0 +1,208 @@
+"""
+Speech-to-text backends for interview answers.
+
+TRANSCRIPTION_BACKEND selects the primary engine ("gemini", "vosk", or
+"mock" for load tests).
+With TRANSCRIPTION_FALLBACK enabled, a failing local engine falls back to
+Gemini. Each backend keeps latency counters, see ``get_transcriber().stats()``.
+"""
+import time
+import asyncio
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import interview, llm, mock_llm
+from .audio import decode_to_pcm
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionBackend:
+    """Base class: turn answer audio bytes into text"""
+
+    name = None
+
+    def transcribe(self, audio_bytes, mime_type):
+        raise NotImplementedError
+
+    async def atranscribe(self, audio_bytes, mime_type):
+        return await sync_to_async(self.transcribe, thread_sensitive=False)(audio_bytes, mime_type)
+
+
+class GeminiTranscriber(TranscriptionBackend):
+    """Send the audio to Gemini and ask for a verbatim transcript"""
+
+    name = "gemini"
+
+    def _contents(self, audio_bytes, mime_type):
+        return [
+            {
+                "mime_type": mime_type,
+                "data": audio_bytes
+            },
+            interview.TRANSCRIBE_PROMPT
+        ]
+
+    def transcribe(self, audio_bytes, mime_type):
+        return llm.generate(self._contents(audio_bytes, mime_type), system_instruction=None).text.strip()
+
+    async def atranscribe(self, audio_bytes, mime_type):
+        response = await llm.agenerate(self._contents(audio_bytes, mime_type), system_instruction=None)
+        return response.text.strip()
+
+
+class VoskTranscriber(TranscriptionBackend):
+    """Local, offline transcription with the Vosk helper in api/utils.py"""
+
+    name = "vosk"
+
+    def __init__(self):
+        # Imported here so the vosk package is only needed when selected; a
+        # missing package raises ImportError now, so the fallback applies
+        import vosk  # noqa: F401
+        from . import utils
+        self.utils = utils
+
+    def warm_up(self):
+        """Load the Vosk model now instead of on the first answer"""
+        self.utils._load_model()
+
+    def transcribe(self, audio_bytes, mime_type):
+        pcm, sample_rate = decode_to_pcm(audio_bytes)
+        return self.utils.transcribe_pcm_with_vosk(pcm, sample_rate).strip()
+
+
+class MockTranscriber(TranscriptionBackend):
+    """Canned transcript after a delay that grows with the upload size"""
+
+    name = "mock"
+
+    def _delay(self, audio_bytes):
+        return settings.MOCK_STT_LATENCY + len(audio_bytes) / settings.MOCK_STT_BYTES_PER_SEC
+
+    def transcribe(self, audio_bytes, mime_type):
+        time.sleep(self._delay(audio_bytes))
+        return mock_llm.TRANSCRIPT
+
+    async def atranscribe(self, audio_bytes, mime_type):
+        await asyncio.sleep(self._delay(audio_bytes))
+        return mock_llm.TRANSCRIPT
+
+
+BACKENDS = {
+    "gemini": GeminiTranscriber,
+    "vosk": VoskTranscriber,
+    "mock": MockTranscriber,
+}
+
+
+class LatencyStats:
+    """Call/error counts and latency totals for one backend"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok=True):
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "avg_ms": round(1000 * self.total_seconds / self.calls, 1) if self.calls else 0.0,
+                "max_ms": round(1000 * self.max_seconds, 1),
+                "total_seconds": round(self.total_seconds, 3),
+            }
+
+
+class Transcriber:
+    """Try each configured backend in order and record per-backend latency"""
+
+    def __init__(self, backends):
+        self.backends = backends
+        self.latency = {backend.name: LatencyStats() for backend in backends}
+
+    def transcribe(self, audio_bytes, mime_type):
+        error = None
+        for backend in self.backends:
+            start = time.perf_counter()
+            try:
+                text = backend.transcribe(audio_bytes, mime_type)
+            except Exception as e:
+                self._record(backend, start, ok=False)
+                logger.warning(f"{backend.name} transcription failed: {e}")
+                error = e
+                continue
+            self._record(backend, start)
+            return text
+        raise error
+
+    async def atranscribe(self, audio_bytes, mime_type):
+        error = None
+        for backend in self.backends:
+            start = time.perf_counter()
+            try:
+                text = await backend.atranscribe(audio_bytes, mime_type)
+            except Exception as e:
+                self._record(backend, start, ok=False)
+                logger.warning(f"{backend.name} transcription failed: {e}")
+                error = e
+                continue
+            self._record(backend, start)
+            return text
+        raise error
+
+    def stats(self):
+        return {name: stats.as_dict() for name, stats in self.latency.items()}
+
+    def _record(self, backend, start, ok=True):
+        elapsed = time.perf_counter() - start
+        self.latency[backend.name].record(elapsed, ok)
+        logger.debug(f"Transcription via {backend.name} took {elapsed * 1000:.0f} ms")
+
+
+_transcriber = None
+
+
+def transcriber_built():
+    """Whether this worker has built its transcriber yet"""
+    return _transcriber is not None
+
+
+def get_transcriber():
+    """Return the configured transcriber, built once per worker"""
+    global _transcriber
+    if _transcriber is None:
+        names = [settings.TRANSCRIPTION_BACKEND]
+        if settings.TRANSCRIPTION_FALLBACK and "gemini" not in names:
+            names.append("gemini")
+        backends = []
+        for name in names:
+            try:
+                backends.append(BACKENDS[name]())
+            except ImportError as e:
+                if name == names[-1] and not backends:
+                    raise
+                logger.warning(f"Skipping {name} transcription: {e}")
+        for backend in backends:
+            if hasattr(backend, "warm_up"):
+                try:
+                    backend.warm_up()
+                except Exception as e:
+                    logger.warning(f"Could not warm up {backend.name} transcription: {e}")
+        _transcriber = Transcriber(backends)
+        logger.info(f"Transcription backends: {', '.join(b.name for b in backends)}")
+    return _transcriber
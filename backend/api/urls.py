@@ -1,10 +1,20 @@
-# api/urls.py
-from django.urls import path
-from . import views
+from django.conf import settings
+from django.urls import path, re_path
+from . import views, async_views, metrics, history
+
+# ASYNC_VIEWS=True serves the interview endpoints from api/async_views.py
+# (run under an ASGI worker); otherwise the sync DRF views are used.
+handlers = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('question/', views.get_question, name='get_question'),
-    path('answer/', views.submit_answer, name='submit_answer'),
-    path('end/', views.end_interview, name='end_interview'),
-    
+    path('test/', views.test_endpoint, name='test_endpoint'),
+    path('question/', handlers.get_question, name='get_question'),
+    path('answer/', handlers.submit_answer, name='submit_answer'),
+    path('answer/stream/', handlers.submit_answer_stream, name='submit_answer_stream'),
+    path('answer/chunk/', handlers.upload_chunk, name='upload_chunk'),
+    path('end/', handlers.end_interview, name='end_interview'),
+    path('end/<str:job_id>/', handlers.end_status, name='end_status'),
+    path('history/', history.history_list, name='history_list'),
+    path('history/<int:record_id>/', history.history_detail, name='history_detail'),
+    re_path(r'^metrics/?$', metrics.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,9 +1,8 @@
 import os
 import json
-import subprocess
-from vosk import Model, KaldiRecognizer
-import wave
-import requests
+import threading
+from .audio import decode_to_pcm
+from . import llm
 
 # ---------------------------
 # GEMINI: placeholder calls — set GEMINI_API_KEY in your environment
@@ -18,51 +17,78 @@ GEMINI_ENDPOINT = os.environ.get('GEMINI_ENDPOINT', 'https://api.generativeai.ex
 VOSK_MODEL_PATH = os.environ.get('VOSK_MODEL_PATH', '/opt/vosk-model-small')
 
 _model = None
+_model_lock = threading.Lock()
 
 def _load_model():
     global _model
     if _model is None:
-        _model = Model(VOSK_MODEL_PATH)
+        # Several request threads may race here on the first answer
+        with _model_lock:
+            if _model is None:
+                from vosk import Model
+                _model = Model(VOSK_MODEL_PATH)
     return _model
 
 
 def transcribe_with_vosk(filepath):
     """
     Transcribe an audio file (wav, mp3, webm, etc.) using Vosk.
-    Converts audio to mono 16-bit PCM if needed.
+    Non-WAV input is decoded through an ffmpeg pipe; nothing is written to disk.
     """
-    wf = wave.open(filepath, 'rb')
-
-    # Convert to mono 16-bit PCM if needed
-    if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
-        converted = filepath + '.mono.wav'
-        cmd = [
-            'ffmpeg', '-y', '-i', filepath,
-            '-ar', '16000', '-ac', '1', '-sample_fmt', 's16',
-            converted
-        ]
-        subprocess.check_call(cmd)
-        wf = wave.open(converted, 'rb')
-
-    model = _load_model()
-    rec = KaldiRecognizer(model, wf.getframerate())
-
-    results = []
-    while True:
-        data = wf.readframes(4000)
-        if len(data) == 0:
-            break
-        if rec.AcceptWaveform(data):
-            part = json.loads(rec.Result())
-            results.append(part.get('text', ''))
-
-    # Append final partial result
-    final = json.loads(rec.FinalResult())
-    results.append(final.get('text', ''))
-
-    # Combine results into a single string
-    text = ' '.join([r for r in results if r])
-    return text
+    with open(filepath, 'rb') as f:
+        audio_bytes = f.read()
+    pcm, sample_rate = decode_to_pcm(audio_bytes)
+    return transcribe_pcm_with_vosk(pcm, sample_rate)
+
+
+def transcribe_pcm_with_vosk(pcm, sample_rate=16000):
+    """Transcribe mono 16-bit PCM bytes using Vosk."""
+    stream = VoskStream(sample_rate)
+    stream.accept(pcm)
+    return stream.finish()
+
+
+class VoskStream:
+    """
+    Incremental Vosk recognizer: feed PCM as it arrives, in any sized pieces,
+    and only the last partial block is left to decode on ``finish``.
+    """
+
+    BLOCK = 4000 * 2  # 4000 frames of 16-bit audio
+
+    def __init__(self, sample_rate=16000):
+        from vosk import KaldiRecognizer
+        self.rec = KaldiRecognizer(_load_model(), sample_rate)
+        self.results = []
+        self._buffer = bytearray()
+
+    def accept(self, pcm):
+        self._buffer += pcm
+        # Walk whole blocks by offset and drop them in one go: slicing the
+        # rest off after every block is quadratic for a whole answer
+        offset = 0
+        with memoryview(self._buffer) as view:
+            while len(view) - offset >= self.BLOCK:
+                self._accept_block(bytes(view[offset:offset + self.BLOCK]))
+                offset += self.BLOCK
+        del self._buffer[:offset]
+
+    def finish(self):
+        if self._buffer:
+            self._accept_block(bytes(self._buffer))
+            self._buffer.clear()
+
+        # Append final partial result
+        final = json.loads(self.rec.FinalResult())
+        self.results.append(final.get('text', ''))
+
+        # Combine results into a single string
+        return ' '.join([r for r in self.results if r])
+
+    def _accept_block(self, data):
+        if self.rec.AcceptWaveform(data):
+            part = json.loads(self.rec.Result())
+            self.results.append(part.get('text', ''))
 
 # ---------------------------
 # Gemini API helper
@@ -82,23 +108,30 @@ def call_gemini_generate(prompt: str) -> str:
         'max_tokens': 300
     }
 
+    def post(timeout):
+        # Pooled keep-alive session; 429/5xx are raised so llm.call() retries them
+        response = llm.http_session().post(GEMINI_ENDPOINT, headers=headers, json=payload, timeout=timeout)
+        response.raise_for_status()
+        return response
+
     try:
-        response = requests.post(GEMINI_ENDPOINT, headers=headers, json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('text') or data.get('output') or json.dumps(data)
-        else:
-            print("Gemini API error:", response.status_code, response.text)
-            return ""
+        response = llm.call(post)
+        data = response.json()
+        return data.get('text') or data.get('output') or json.dumps(data)
     except Exception as e:
         print("Error calling Gemini API:", str(e))
         return ""
 
 
 # ---------------------------
-# Example usage
+# Example usage (from backend/: python -m api.utils)
 # ---------------------------
+# Single-file check; for whole directories use `python manage.py batch_evaluate`
 if __name__ == "__main__":
+    import django
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mockmate.settings")
+    django.setup()  # the shared LLM client reads its limits from settings
+
     audio_file = "example_answer.webm"  # Replace with your file path
     print("Transcribing audio...")
     transcript = transcribe_with_vosk(audio_file)
@@ -1,14 +1,21 @@
 import os
-import random
-import tempfile
 import logging
 import json
-import google.generativeai as genai
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework.decorators import api_view, parser_classes
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework.parsers import MultiPartParser, FormParser
 from dotenv import load_dotenv
+from .sessions import get_session_store, SessionLockTimeout
+from .transcription import get_transcriber
+from .audio import read_upload
+from .streaming import chunked_uploads, ChunkError, expected_chunks
+from .openers import get_opener_pool
+from .replay import get_replay_cache
+from . import interview, context, prefetch, pipeline, llm, replay, metrics, jobs, history, parsing, preprocess
+from . import startup, transcription
 
 # Load environment variables
 load_dotenv()
@@ -17,16 +24,14 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configure Gemini
+# Gemini is configured on first use by the shared client in api/llm.py
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
 
-# Load Whisper model
-# No model loading needed — Gemini handles everything
-logger.info("Using Gemini for transcription and AI responses")
+# Interview sessions live in a store shared by all workers (see api/sessions.py)
+session_store = get_session_store()
 
-# Interview session storage (in production, use database or Redis)
-interview_sessions = {}
+# Stored replies for retried requests (see api/replay.py)
+replies = get_replay_cache()
 
 # REMOVED: All pyttsx3 and TTS functionality - doesn't work on cloud platforms
 # TTS has been completely removed as it requires audio output devices
@@ -39,8 +44,10 @@ def test_endpoint(request):
     return JsonResponse({
         "status": "success",
         "message": "Backend is running successfully",
-        "whisper_loaded": whisper_model is not None,
-        "gemini_configured": GEMINI_API_KEY is not None
+        "transcription_backend": settings.TRANSCRIPTION_BACKEND,
+        "transcriber_loaded": transcription.transcriber_built(),
+        "gemini_configured": GEMINI_API_KEY is not None,
+        "startup": startup.report(),
     })
 
 
@@ -48,66 +55,32 @@ def test_endpoint(request):
 def get_question(request):
     """Start a new interview or get the first question"""
     topic = request.GET.get("topic", "general")
-    session_id = request.GET.get("session_id", str(random.randint(10000, 99999)))
-    
-    logger.info(f"Starting interview session {session_id} for topic: {topic}")
-    
+    logger.info(f"Starting interview for topic: {topic}")
+
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        
-        prompt = f"""You are a technical interviewer conducting an oral interview about {topic}. 
+        # Serve a pre-generated opener when the topic's pool has one
+        pool = get_opener_pool()
+        opener = pool.take(topic) if pool else None
+        if opener:
+            greeting, question = opener
+        else:
+            with metrics.stage("question", "generation"):
+                response = llm.generate(interview.opening_prompt(topic), parsing.generation_config("opening"))
+            ai_response = response.text.strip()
 
-Your role:
-- Give a very brief, friendly greeting (just "Hi, I am your interviewer" or "Hello, I am your interviewer")
-- Ask only oral discussion questions that can be answered by speaking
-- NO coding questions, NO writing code, NO diagrams, NO whiteboard problems
-- Focus on conceptual understanding, experience, and verbal explanations
-- Ask about concepts, methodologies, best practices, problem-solving approaches
-- Questions should be answerable through conversation only
+            greeting, question = interview.parse_opening(ai_response)
 
-Generate the first question for this oral interview. Format your response as:
-GREETING: [Very brief greeting - just "Hi, I am your interviewer" or "Hello, I am your interviewer let's start"]
-QUESTION: [Your oral/conceptual question about {topic} that requires only speaking to answer]
+        # Store session
+        session = interview.new_session(topic, greeting, question, request.GET.get("client_id", "")[:64])
+        # The server picks the session ID; a client can't choose or reuse one
+        with metrics.stage("question", "session_save"):
+            session_id = session_store.create(session)
+        logger.info(f"Started interview session {session_id}")
+        history.start_interview(session_id, session)
+        prefetch.schedule(session_id, interview.current_question_id(session_id, session), session)
 
-Keep the greeting extremely short and ask only discussion-based questions."""
+        return JsonResponse(interview.opening_payload(session_id, greeting, question))
 
-        response = model.generate_content(prompt)
-        ai_response = response.text.strip()
-        
-        # Parse the response
-        lines = ai_response.split('\n')
-        greeting = ""
-        question = ""
-        
-        for line in lines:
-            if line.startswith("GREETING:"):
-                greeting = line.replace("GREETING:", "").strip()
-            elif line.startswith("QUESTION:"):
-                question = line.replace("QUESTION:", "").strip()
-        
-        # Fallback if parsing fails
-        if not question:
-            question = ai_response
-        if not greeting:
-            greeting = "Hi, I am your interviewer, let's start."
-        
-        # Store session
-        interview_sessions[session_id] = {
-            "topic": topic,
-            "question_count": 1,
-            "conversation_history": [
-                {"role": "interviewer", "content": f"{greeting} {question}"}
-            ]
-        }
-        
-        return JsonResponse({
-            "session_id": session_id,
-            "question_id": f"{session_id}_q1",
-            "greeting": greeting,
-            "question": question,
-            "question_number": 1
-        })
-        
     except Exception as e:
         logger.error(f"Error in get_question: {str(e)}", exc_info=True)
         return JsonResponse({"error": str(e)}, status=500)
@@ -118,244 +91,360 @@ Keep the greeting extremely short and ask only discussion-based questions."""
 @parser_classes([MultiPartParser, FormParser])
 def submit_answer(request):
     """Process answer and get feedback + next question"""
-    logger.info("=== PROCESSING INTERVIEW ANSWER ===")
-    
-    logger.info(f"Available sessions: {list(interview_sessions.keys())}")
-    logger.info(f"Request session_id: {request.data.get('session_id')}")
-    logger.info(f"Request question_id: {request.data.get('question_id')}")
-    
     try:
         # Get request data
         audio_file = request.FILES.get("audio")
         question_id = request.data.get("question_id")
         session_id = request.data.get("session_id")
-        
-        if not audio_file:
-            return JsonResponse({"error": "No audio file provided"}, status=400)
-        
+
         if not question_id or not session_id:
             return JsonResponse({"error": "Missing session or question ID"}, status=400)
 
-        # Get session data
-        session = interview_sessions.get(session_id)
+        try:
+            chunks = expected_chunks(request.data.get("chunks"))
+        except ChunkError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        audio_bytes = None
+        mime_type = None
+        if audio_file:
+            logger.debug(f"Answer upload: {audio_file.size} bytes, {audio_file.content_type}")
+            # Collect the upload in memory
+            with metrics.stage("answer", "upload"):
+                audio_bytes = read_upload(audio_file)
+            metrics.AUDIO_BYTES.observe(len(audio_bytes))
+            mime_type = audio_file.content_type or "audio/webm"
+
+        session = session_store.get(session_id)
         if not session:
             return JsonResponse({"error": "Interview session not found"}, status=400)
 
-        logger.info(f"Processing answer for session {session_id}")
-        logger.info(f"Audio file size: {audio_file.size} bytes")
-        logger.info(f"Audio file type: {audio_file.content_type}")
+        # A retry of an answer that was already processed gets the same reply
+        reply_key = replay.answer_key(session_id, session.get("nonce", ""), question_id, audio_bytes)
+        stored = replies.get(reply_key)
+        if stored is not None:
+            return replay.replayed(reply_key, stored)
 
-    
+        # The recording may already have been uploaded through answer/chunk/
+        if audio_bytes is None and not chunked_uploads.has(session_id, question_id):
+            return JsonResponse({"error": "No audio file provided"}, status=400)
 
-        # Save and transcribe audio
-        tmp_path = None
+        # Silent recordings are rejected here, before any model call
         try:
-            # Create temp file with appropriate extension
-            suffix = ".webm"
-            if audio_file.content_type:
-                if "wav" in audio_file.content_type:
-                    suffix = ".wav"
-                elif "mp3" in audio_file.content_type:
-                    suffix = ".mp3"
-                elif "ogg" in audio_file.content_type:
-                    suffix = ".ogg"
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                for chunk in audio_file.chunks():
-                    tmp.write(chunk)
-                tmp_path = tmp.name
-            
-            logger.info(f"Audio saved to temp file: {tmp_path}")
-            
-            # Transcribe with Whisper
-            logger.info("Starting transcription...")
-            
-            # Read audio file as bytes
-            with open(tmp_path, "rb") as f:
-                audio_bytes = f.read()
-            # Transcribe using Gemini
-            transcription_model = genai.GenerativeModel("gemini-2.5-flash")
-            transcription_response = transcription_model.generate_content([
-                {
-                    "mime_type": audio_file.content_type or "audio/webm",
-                    "data": audio_bytes
-                },
-                "Transcribe this audio exactly as spoken. Return only the spoken words, nothing else."
-            ])
-            transcript = transcription_response.text.strip()
-            
-            logger.info(f"Transcription completed: {transcript}")
-            
-            if not transcript or len(transcript) < 3:
-                return JsonResponse({
-                    "error": "No clear speech detected. Please try speaking more clearly.",
-                    "transcript": transcript
-                }, status=400)
-
-            # Add answer to conversation history
-            session["conversation_history"].append({
-                "role": "candidate", 
-                "content": transcript
-            })
-
-            # Generate interviewer response
-            model = genai.GenerativeModel("gemini-2.5-flash")
-            
-            # Build conversation context
-            conversation_context = ""
-            for entry in session["conversation_history"]:
-                role = "Interviewer" if entry["role"] == "interviewer" else "Candidate"
-                conversation_context += f"{role}: {entry['content']}\n"
-            
-            current_question_num = session["question_count"]
-            topic = session["topic"]
-            
-            interviewer_prompt = f"""You are conducting an oral technical interview about {topic}. 
-
-CONVERSATION SO FAR:
-{conversation_context}
-
-The candidate just answered question {current_question_num}. As a professional interviewer:
-
-1. Give SHORT, specific feedback (2-3 sentences maximum)
-2. Briefly mention what they got right
-3. Point out one key area for improvement if needed
-4. Ask your next ORAL question about {topic}
-5. Keep feedback concise and to the point
-6. Be encouraging but brief
-
-IMPORTANT CONSTRAINTS:
-- FEEDBACK must be SHORT (maximum 2-3 sentences)
-- Ask ONLY oral/discussion questions that can be answered by speaking
-- NO coding questions, NO "write code", NO algorithms to implement
-- NO whiteboard problems, NO diagrams, NO technical writing
-- Focus on concepts, experience, methodologies, best practices
-- Questions should require only verbal explanations
-
-Format your response as:
-FEEDBACK: [Your SHORT feedback (2-3 sentences max) - be concise and specific]
-NEXT_QUESTION: [Your next ORAL question about {topic} concepts/experience]
-
-Keep feedback brief and conversational. Focus on key points only."""
-
-            response = model.generate_content(interviewer_prompt)
-            ai_response = response.text.strip()
-            
-            logger.info(f"Generated AI response: {ai_response[:200]}...")
-            
-            # Parse feedback and next question
-            feedback = ""
-            next_question = ""
-            
-            if "FEEDBACK:" in ai_response and "NEXT_QUESTION:" in ai_response:
-                parts = ai_response.split("NEXT_QUESTION:")
-                feedback = parts[0].replace("FEEDBACK:", "").strip()
-                next_question = parts[1].strip()
-            else:
-                # Fallback parsing
-                lines = ai_response.split('\n')
-                current_section = ""
-                
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith("FEEDBACK:"):
-                        current_section = "feedback"
-                        feedback = line.replace("FEEDBACK:", "").strip()
-                    elif line.startswith("NEXT_QUESTION:"):
-                        current_section = "question"
-                        next_question = line.replace("NEXT_QUESTION:", "").strip()
-                    elif line and current_section == "feedback":
-                        feedback += " " + line
-                    elif line and current_section == "question":
-                        next_question += " " + line
-            
-            # Final fallback
-            if not feedback:
-                feedback = "Thank you for your answer. Let me provide some feedback."
-            if not next_question:
-                next_question = "Let's move on to the next question."
-            
-            # Update session
-            session["question_count"] += 1
-            session["conversation_history"].append({
-                "role": "interviewer",
-                "content": f"Feedback: {feedback} Next question: {next_question}"
-            })
-            
-            new_question_id = f"{session_id}_q{session['question_count']}"
-            
+            audio_bytes, mime_type = _prepare_audio("answer", audio_bytes, mime_type)
+        except preprocess.NoSpeechError:
             return JsonResponse({
-                "transcript": transcript,
-                "feedback": feedback,
-                "next_question": next_question,
-                "question_id": new_question_id,
-                "session_id": session_id,
-                "question_number": session["question_count"]
-            })
-
-        finally:
-            # Clean up temp file
-            if tmp_path and os.path.exists(tmp_path):
-                try:
-                    os.remove(tmp_path)
-                    logger.info(f"Cleaned up temp file: {tmp_path}")
-                except Exception as e:
-                    logger.error(f"Cleanup error: {e}")
+                "error": "No clear speech detected. Please try speaking more clearly.",
+                "transcript": ""
+            }, status=400)
+
+        # Hold the session lock for the whole answer so two requests for the
+        # same interview (e.g. a client retry) can't interleave their updates
+        try:
+            with session_store.lock(session_id):
+                # A retry that waited for the original request finds its reply here
+                stored = replies.get(reply_key)
+                if stored is not None:
+                    return replay.replayed(reply_key, stored)
+                session = session_store.get(session_id)
+                if not interview.is_active(session):
+                    return JsonResponse({"error": "Interview session not found"}, status=400)
+                return _process_answer(session_id, question_id, session, audio_bytes, mime_type, reply_key, chunks)
+        except SessionLockTimeout:
+            return JsonResponse({"error": "Previous answer for this session is still being processed"}, status=409)
+        except ChunkError as e:
+            return JsonResponse({"error": str(e)}, status=400)
 
     except Exception as e:
         logger.error(f"Error in submit_answer: {str(e)}", exc_info=True)
         return JsonResponse({"error": f"Processing failed: {str(e)}"}, status=500)
 
 
+def _process_answer(session_id, question_id, session, audio_bytes, mime_type, reply_key, chunks=None):
+    """Transcribe an answer, generate feedback and advance the session"""
+    logger.info(f"Processing answer for session {session_id}, question {question_id}")
+
+    # Chunked answers are transcribed already; whole uploads may overlap
+    # transcription with the interviewer reply (see api/pipeline.py)
+    serial = audio_bytes is None or pipeline.mode() == "serial"
+    if serial:
+        with metrics.stage("answer", "transcription"):
+            transcript = _transcribe_answer(session_id, question_id, audio_bytes, mime_type, chunks)
+        logger.debug("Transcription completed", extra={"transcript": transcript})
+    else:
+        candidates = prefetch.take(question_id) if pipeline.mode() == "concurrent" else None
+        with metrics.stage("answer", f"pipeline_{pipeline.mode()}"):
+            transcript, feedback, next_question = pipeline.run(session, audio_bytes, mime_type, candidates)
+        logger.debug(f"Answer pipeline ({pipeline.mode()}) completed", extra={"transcript": transcript})
+
+    if not interview.is_usable_transcript(transcript):
+        return JsonResponse({
+            "error": "No clear speech detected. Please try speaking more clearly.",
+            "transcript": transcript
+        }, status=400)
+
+    # Add answer to conversation history
+    interview.record_answer(session, transcript)
+
+    if serial:
+        # Generate interviewer response; with prefetched follow-ups the model
+        # only writes feedback and picks one of them
+        candidates = prefetch.take(question_id)
+        with metrics.stage("answer", "generation"):
+            response = llm.generate(context.answer_prompt(session, candidates), parsing.generation_config("answer"))
+        ai_response = response.text.strip()
+
+        logger.debug("Generated AI response", extra={"ai_response": ai_response[:200]})
+
+        # Parse feedback and next question
+        with metrics.stage("answer", "parsing"):
+            feedback, next_question = interview.parse_feedback(ai_response)
+            if candidates:
+                next_question = prefetch.resolve(next_question, candidates)
+
+    # Update session
+    interview.record_feedback(session, feedback, next_question)
+    with metrics.stage("answer", "session_save"):
+        session_store.save(session_id, session)
+    history.record_turn(session_id, session)
+    context.schedule_compaction(session_id, session)
+    prefetch.schedule(session_id, interview.current_question_id(session_id, session), session)
+
+    payload = interview.answer_payload(session_id, session, transcript, feedback, next_question)
+    replies.set(reply_key, payload)
+    return JsonResponse(payload)
+
+
+def _prepare_audio(endpoint, audio_bytes, mime_type):
+    """Trim and re-encode a whole upload (api/preprocess.py); chunked answers pass through"""
+    if audio_bytes is None or not preprocess.enabled():
+        return audio_bytes, mime_type
+    with metrics.stage(endpoint, "preprocess"):
+        return preprocess.prepare(audio_bytes, mime_type)
+
+
+def _transcribe_answer(session_id, question_id, audio_bytes, mime_type, chunks=None):
+    """Transcribe a full upload, or finish an answer streamed through answer/chunk/"""
+    if audio_bytes is None:
+        return chunked_uploads.finish(session_id, question_id, chunks)
+    return get_transcriber().transcribe(audio_bytes, mime_type)
+
+
+@csrf_exempt
+@api_view(["POST"])
+@parser_classes([MultiPartParser, FormParser])
+def upload_chunk(request):
+    """
+    Accept one chunk of an answer recording while the candidate is speaking.
+
+    Fields: session_id, question_id, seq (0, 1, 2, ...) and the audio chunk.
+    Afterwards call answer/ (or answer/stream/) without an audio file, with
+    ``chunks`` set to the number of chunks sent so a missing last chunk is
+    reported instead of transcribing a truncated recording. After a
+    "Missing chunk" error, upload that chunk and call answer/ again.
+    """
+    chunk = request.FILES.get("audio")
+    question_id = request.data.get("question_id")
+    session_id = request.data.get("session_id")
+
+    if not chunk:
+        return JsonResponse({"error": "No audio chunk provided"}, status=400)
+
+    if not question_id or not session_id:
+        return JsonResponse({"error": "Missing session or question ID"}, status=400)
+
+    try:
+        seq = int(request.data.get("seq"))
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "Invalid chunk sequence number"}, status=400)
+
+    if seq == 0 and not interview.is_active(session_store.get(session_id)):
+        return JsonResponse({"error": "Interview session not found"}, status=400)
+
+    try:
+        answer = chunked_uploads.append(session_id, question_id, seq, read_upload(chunk), chunk.content_type or "audio/webm")
+    except ChunkError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({
+        "session_id": session_id,
+        "question_id": question_id,
+        "received": seq,
+        "bytes": len(answer.buffer)
+    })
+
+
+# Plain Django view: DRF content negotiation would reject
+# "Accept: text/event-stream" with a 406.
+@csrf_exempt
+@require_POST
+def submit_answer_stream(request):
+    """
+    Streaming variant of submit_answer (server-sent events).
+
+    Emits a ``transcript`` event as soon as transcription finishes, then
+    ``feedback`` and ``next_question`` deltas as the model generates them,
+    and finally ``done`` with the same payload submit_answer returns.
+    Failures are reported as an ``error`` event.
+    """
+    audio_file = request.FILES.get("audio")
+    question_id = request.POST.get("question_id")
+    session_id = request.POST.get("session_id")
+
+    if not question_id or not session_id:
+        return JsonResponse({"error": "Missing session or question ID"}, status=400)
+
+    try:
+        chunks = expected_chunks(request.POST.get("chunks"))
+    except ChunkError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    audio_bytes = read_upload(audio_file) if audio_file else None
+    mime_type = (audio_file.content_type or "audio/webm") if audio_file else None
+    session = session_store.get(session_id)
+    if not session:
+        return JsonResponse({"error": "Interview session not found"}, status=400)
+    reply_key = replay.answer_key(session_id, session.get("nonce", ""), question_id, audio_bytes)
+    stored = replies.get(reply_key)
+    if stored is not None:
+        return _event_stream_response(replay.replayed_events(stored))
+
+    if audio_bytes is None and not chunked_uploads.has(session_id, question_id):
+        return JsonResponse({"error": "No audio file provided"}, status=400)
+
+    try:
+        audio_bytes, mime_type = _prepare_audio("answer_stream", audio_bytes, mime_type)
+    except preprocess.NoSpeechError:
+        return JsonResponse({
+            "error": "No clear speech detected. Please try speaking more clearly.",
+            "transcript": ""
+        }, status=400)
+
+    return _event_stream_response(_stream_answer(session_id, question_id, audio_bytes, mime_type, reply_key, chunks))
+
+
+def _event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
+
+
+def _stream_answer(session_id, question_id, audio_bytes, mime_type, reply_key, chunks=None):
+    """Generate the SSE events for one answer while holding the session lock"""
+    try:
+        with session_store.lock(session_id):
+            stored = replies.get(reply_key)
+            if stored is not None:
+                yield from replay.replayed_events(stored)
+                return
+            session = session_store.get(session_id)
+            if not interview.is_active(session):
+                yield interview.sse_event("error", {"error": "Interview session not found", "status": 400})
+                return
+
+            with metrics.stage("answer_stream", "transcription"):
+                transcript = _transcribe_answer(session_id, question_id, audio_bytes, mime_type, chunks)
+            yield interview.sse_event("transcript", {"transcript": transcript})
+
+            if not interview.is_usable_transcript(transcript):
+                yield interview.sse_event("error", {
+                    "error": "No clear speech detected. Please try speaking more clearly.",
+                    "transcript": transcript,
+                    "status": 400
+                })
+                return
+
+            interview.record_answer(session, transcript)
+
+            # Prefetched candidates aren't used here: a numeric choice can't
+            # be streamed as next-question text
+            parser = interview.FeedbackStreamParser()
+            # Includes the time the client takes to read each event
+            with metrics.stage("answer_stream", "generation"):
+                for chunk in llm.stream(context.answer_prompt(session)):
+                    for section, delta in parser.feed(chunk.text):
+                        yield interview.sse_event(section, {"delta": delta})
+            tail, (feedback, next_question) = parser.finish()
+            for section, delta in tail:
+                yield interview.sse_event(section, {"delta": delta})
+
+            interview.record_feedback(session, feedback, next_question)
+            with metrics.stage("answer_stream", "session_save"):
+                session_store.save(session_id, session)
+            history.record_turn(session_id, session)
+            context.schedule_compaction(session_id, session)
+            prefetch.schedule(session_id, interview.current_question_id(session_id, session), session)
+
+            payload = interview.answer_payload(session_id, session, transcript, feedback, next_question)
+            replies.set(reply_key, payload)
+            yield interview.sse_event("done", payload)
+
+    except SessionLockTimeout:
+        yield interview.sse_event("error", {"error": "Previous answer for this session is still being processed", "status": 409})
+    except ChunkError as e:
+        yield interview.sse_event("error", {"error": str(e), "status": 400})
+    except Exception as e:
+        logger.error(f"Error in submit_answer_stream: {str(e)}", exc_info=True)
+        yield interview.sse_event("error", {"error": f"Processing failed: {str(e)}", "status": 500})
+
+
 @api_view(["POST"])
 def end_interview(request):
     """End the interview and get final feedback"""
     try:
         data = json.loads(request.body)
         session_id = data.get("session_id")
-        
-        session = interview_sessions.get(session_id)
+
+        session = session_store.get(session_id)
         if not session:
             return JsonResponse({"error": "Session not found"}, status=400)
-        
+
+        # Only the ended marker is left after the first call; retries get the
+        # summary stored for this interview
+        reply_key = replay.end_key(session_id, session.get("nonce", ""))
+        stored = replies.get(reply_key)
+        if stored is not None:
+            return replay.replayed(reply_key, stored)
+        if not interview.is_active(session):
+            return JsonResponse({"error": "Interview has already ended"}, status=400)
+
+        # Evaluate in the background; the client polls end/<job_id>/
+        if settings.SUMMARY_JOBS:
+            job = jobs.submit(session_id, session.get("nonce", ""))
+            return JsonResponse(jobs.public(job), status=202)
+
         # Generate final interview summary
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        
-        conversation_context = ""
-        for entry in session["conversation_history"]:
-            role = "Interviewer" if entry["role"] == "interviewer" else "Candidate"
-            conversation_context += f"{role}: {entry['content']}\n"
-        
-        summary_prompt = f"""As a professional interviewer, provide a CONCISE final evaluation based on this oral {session['topic']} interview:
-
-FULL INTERVIEW:
-{conversation_context}
-
-Provide a brief structured evaluation (keep each section short):
-1. Overall Performance (2-3 sentences)
-2. Technical Knowledge (2-3 sentences) 
-3. Communication Skills (2-3 sentences)
-4. Key Strengths (1-2 sentences)
-5. Areas for Improvement (1-2 sentences)
-6. Final Recommendation (1-2 sentences)
-
-Be professional and concise. Focus on the most important points only. Keep the entire evaluation under 200 words."""
-
-        response = model.generate_content(summary_prompt)
+        # The whole interview is evaluated, not the rolling summary
+        prompt = interview.summary_prompt(session["topic"], context.full_context(session))
+        try:
+            with metrics.stage("end", "generation"):
+                response = llm.generate(prompt)
+        except Exception:
+            # Keep the transcript; a retried end/ fills in the evaluation
+            history.save_interview(session_id, session, "")
+            raise
         final_feedback = response.text.strip()
-        
+
+        # Store the summary before the session goes away
+        payload = interview.summary_payload(session, final_feedback)
+        replies.set(reply_key, payload)
+        history.save_interview(session_id, session, final_feedback)
+
         # Clean up session
-        if session_id in interview_sessions:
-            del interview_sessions[session_id]
-        
-        return JsonResponse({
-            "final_feedback": final_feedback,
-            "questions_asked": session["question_count"],
-            "topic": session["topic"]
-        })
-        
+        session_store.save(session_id, interview.ended_session(session))
+
+        return JsonResponse(payload)
+
     except Exception as e:
         logger.error(f"Error in end_interview: {str(e)}", exc_info=True)
         return JsonResponse({"error": str(e)}, status=500)
 
 
+@api_view(["GET"])
+def end_status(request, job_id):
+    """Poll a queued end-of-interview evaluation"""
+    job = jobs.get(job_id)
+    if job is None:
+        return JsonResponse({"error": "Job not found"}, status=404)
+    return JsonResponse(jobs.public(job))
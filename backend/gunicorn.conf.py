@@ -0,0 +1,26 @@
+"""
+gunicorn settings, read automatically when gunicorn starts from backend/.
+
+Command-line flags (Procfile, `manage.py loadtest`) still override these.
+
+GUNICORN_PRELOAD=True loads the application in the master before forking
+and turns on STARTUP_WARMUP, so the Gemini SDK, the URLconf and any local
+speech-to-text model are loaded once and shared copy-on-write by every
+worker; new workers then start in milliseconds. Code changes need a full
+restart rather than a HUP in that mode. See api/startup.py.
+"""
+import os
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'False') == 'True'
+if preload_app:
+    os.environ.setdefault('STARTUP_WARMUP', 'True')
+
+
+def post_fork(server, worker):
+    from api import startup
+    startup.worker_forked(preloaded=server.cfg.preload_app)
+
+
+def post_worker_init(worker):
+    from api import startup
+    startup.worker_ready()
@@ -45,8 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.trace_id_middleware',  # X-Request-ID trace IDs for log lines
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware (must be before CommonMiddleware)
+    'api.middleware.admission_control_middleware',  # 429/503 under overload, after CORS so browsers can read them
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,6 +76,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'mockmate.wsgi.application'
+ASGI_APPLICATION = 'mockmate.asgi.application'
+
+# Serve the interview endpoints from the async views (requires an ASGI worker,
+# e.g. gunicorn mockmate.asgi:application -k uvicorn.workers.UvicornWorker)
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
 
 
 # Password validation
@@ -140,12 +147,32 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Production SQLite profile (SQLITE_TUNING=True): every connection gets WAL
+# journaling and the pragmas below (see api/sqlite.py), writers wait up to
+# SQLITE_BUSY_TIMEOUT seconds for the lock instead of failing with "database
+# is locked", transactions take the write lock up front (IMMEDIATE) so that
+# wait actually happens, and connections are reused across requests.
+SQLITE_TUNING = os.getenv('SQLITE_TUNING', 'True') == 'True'
+SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '20'))  # seconds
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')  # safe with WAL
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))  # bytes
+SQLITE_CACHE_KB = int(os.getenv('SQLITE_CACHE_KB', '20000'))  # page cache per connection
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+if SQLITE_TUNING:
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            'transaction_mode': 'IMMEDIATE',
+        },
+    })
 
 # CORS settings 
 cors_origins = os.getenv(
@@ -192,6 +219,9 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# Lets the frontend honor the back-off on 429/503 responses
+CORS_EXPOSE_HEADERS = ['Retry-After']
+
 
 # File upload settings - Important for audio file handling
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10 MB
@@ -205,23 +235,45 @@ if DEBUG or not os.environ.get('RAILWAY_ENVIRONMENT'):
     LOGS_DIR.mkdir(exist_ok=True)
 
 # Logging configuration - Railway-friendly
+# Logging: records go through a queue to a background writer thread
+# (LOG_QUEUE), as text or one JSON object per line (LOG_FORMAT). Debug
+# details such as transcripts and model excerpts are logged for a sample
+# of requests only (LOG_DEBUG_SAMPLE_RATE, 0 to 1).
+LOG_QUEUE = os.getenv('LOG_QUEUE', 'True') == 'True'
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '0'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
         'verbose': {
-            'format': '{levelname} {asctime} {module} {message}',
+            '()': 'api.log.TextFormatter',
+            'format': '{levelname} {asctime} {module} [{trace_id}] {message}',
             'style': '{',
         },
         'simple': {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'api.log.JsonFormatter',
+        },
+    },
+    'filters': {
+        'trace_id': {
+            '()': 'api.middleware.TraceIdFilter',
+        },
+        'debug_sample': {
+            '()': 'api.log.SampledDebugFilter',
+            'rate': LOG_DEBUG_SAMPLE_RATE,
+        },
     },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            'class': 'api.log.QueueLogHandler' if LOG_QUEUE else 'logging.StreamHandler',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose',
+            'filters': ['trace_id', 'debug_sample'],
         },
     },
     'root': {
@@ -236,7 +288,7 @@ LOGGING = {
         },
         'api': {
             'handlers': ['console'],
-            'level': 'INFO',
+            'level': 'DEBUG' if LOG_DEBUG_SAMPLE_RATE > 0 else 'INFO',
             'propagate': False,
         },
     },
@@ -249,6 +301,136 @@ if not GEMINI_API_KEY and not DEBUG:
     raise ValueError("GEMINI_API_KEY environment variable is required in production")
 
 
+# Speech-to-text: 'gemini' (default) or 'vosk' (local, needs the vosk package,
+# ffmpeg and a model at VOSK_MODEL_PATH). With the fallback on, a failing
+# local engine hands the answer to Gemini.
+TRANSCRIPTION_BACKEND = os.getenv('TRANSCRIPTION_BACKEND', 'gemini')
+TRANSCRIPTION_FALLBACK = os.getenv('TRANSCRIPTION_FALLBACK', 'True') == 'True'
+
+
+# Conversation context sent with each interviewer prompt: the most recent
+# history entries verbatim, older ones folded into a running summary
+# ('model' summarizes with Gemini, 'extractive' keeps first sentences).
+CONTEXT_RECENT_TURNS = int(os.getenv('CONTEXT_RECENT_TURNS', '6'))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv('CONTEXT_SUMMARY_TOKENS', '300'))
+CONTEXT_SUMMARY_MODE = os.getenv('CONTEXT_SUMMARY_MODE', 'model')
+
+
+# Pre-generated opening questions, served at random and refilled in the
+# background. OPENER_POOL_TOPICS (comma separated) are warmed at startup;
+# other topics get a pool once a worker has seen OPENER_POOL_MIN_REQUESTS
+# requests for them (0: only OPENER_POOL_TOPICS are pooled).
+OPENER_POOL_ENABLED = os.getenv('OPENER_POOL_ENABLED', 'True') == 'True'
+OPENER_POOL_SIZE = int(os.getenv('OPENER_POOL_SIZE', '8'))
+OPENER_POOL_TTL = int(os.getenv('OPENER_POOL_TTL', '3600'))  # seconds
+OPENER_POOL_TOPICS = [t.strip() for t in os.getenv('OPENER_POOL_TOPICS', '').split(',') if t.strip()]
+OPENER_POOL_MIN_REQUESTS = int(os.getenv('OPENER_POOL_MIN_REQUESTS', '3'))
+
+
+# Speculative prefetch of follow-up questions while the candidate answers
+PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', 'False') == 'True'
+PREFETCH_CANDIDATES = int(os.getenv('PREFETCH_CANDIDATES', '3'))
+PREFETCH_TTL = int(os.getenv('PREFETCH_TTL', '900'))  # seconds
+PREFETCH_CACHE_ALIAS = 'interviews'
+
+
+# Shared Gemini client (api/llm.py): per-attempt timeout and overall deadline
+# in seconds, retries on 429/5xx, and a per-worker cap on in-flight calls
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '30'))
+LLM_DEADLINE = float(os.getenv('LLM_DEADLINE', '60'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '3'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '10'))
+
+# LLM_BACKEND=mock swaps Gemini for the deterministic stand-in in
+# api/mock_llm.py (TRANSCRIPTION_BACKEND=mock does the same for speech-to-text).
+# Latencies are in seconds; used by `manage.py loadtest`.
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')
+MOCK_LLM_LATENCY = float(os.getenv('MOCK_LLM_LATENCY', '0.4'))  # time to first token
+MOCK_LLM_TOKENS_PER_SEC = float(os.getenv('MOCK_LLM_TOKENS_PER_SEC', '150'))
+MOCK_STT_LATENCY = float(os.getenv('MOCK_STT_LATENCY', '0.3'))
+MOCK_STT_BYTES_PER_SEC = float(os.getenv('MOCK_STT_BYTES_PER_SEC', '200000'))
+
+# Stored replies for retried submit_answer / end_interview requests, keyed on
+# session, question and audio hash (see api/replay.py)
+REPLAY_CACHE_ALIAS = 'interviews'
+REPLAY_TTL = int(os.getenv('REPLAY_TTL', '600'))  # seconds
+REPLAY_LOCAL_ENTRIES = int(os.getenv('REPLAY_LOCAL_ENTRIES', '1000'))
+
+# Prometheus metrics at /api/metrics (per worker process, see api/metrics.py).
+# Off by default: the route is public. With METRICS_TOKEN set, scrapes must
+# send "Authorization: Bearer <token>".
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# How submit_answer turns a whole upload into feedback: 'serial' (transcribe,
+# then reply), 'multimodal' (one call with the audio) or 'concurrent'
+# (next question generated while transcribing). See api/pipeline.py.
+ANSWER_PIPELINE = os.getenv('ANSWER_PIPELINE', 'serial')
+
+# end_interview queues the final summary on a background pool and returns a
+# job ID to poll at end/<job_id>/ (see api/jobs.py)
+SUMMARY_JOBS = os.getenv('SUMMARY_JOBS', 'True') == 'True'
+SUMMARY_WORKERS = int(os.getenv('SUMMARY_WORKERS', '4'))  # per worker process
+SUMMARY_JOB_TTL = int(os.getenv('SUMMARY_JOB_TTL', '600'))  # seconds
+SUMMARY_JOB_TIMEOUT = int(os.getenv('SUMMARY_JOB_TIMEOUT', '300'))  # seconds before an unfinished job counts as lost
+SUMMARY_JOB_CACHE_ALIAS = 'interviews'
+
+# Prompt layout and caching (api/prompts.py): the shared interviewer rules are
+# a system instruction and per-call text comes last, so Gemini's implicit
+# prefix caching applies. Templates are compiled for the PROMPT_TOPICS_CACHED
+# latest topics.
+PROMPT_TOPICS_CACHED = int(os.getenv('PROMPT_TOPICS_CACHED', '256'))
+
+# Ask Gemini for JSON matching a response schema on the opening, answer and
+# feedback calls; replies that aren't JSON fall back to the marker-line
+# parser (see api/parsing.py)
+STRUCTURED_OUTPUT = os.getenv('STRUCTURED_OUTPUT', 'True') == 'True'
+
+# Answer audio preprocessing before transcription: energy VAD, silence
+# trimming and a compact Opus re-encode; silent clips are rejected before
+# any model call (see api/preprocess.py). Turned off, with a warning, when
+# ffmpeg isn't installed.
+AUDIO_PREPROCESS = os.getenv('AUDIO_PREPROCESS', 'True') == 'True'
+AUDIO_MIN_SPEECH_MS = int(os.getenv('AUDIO_MIN_SPEECH_MS', '300'))
+AUDIO_VAD_FLOOR_DBFS = float(os.getenv('AUDIO_VAD_FLOOR_DBFS', '-50'))
+AUDIO_VAD_MARGIN_DB = float(os.getenv('AUDIO_VAD_MARGIN_DB', '10'))
+AUDIO_VAD_SPEECH_DBFS = float(os.getenv('AUDIO_VAD_SPEECH_DBFS', '-35'))  # always counted as speech
+AUDIO_VAD_PADDING_MS = int(os.getenv('AUDIO_VAD_PADDING_MS', '300'))
+AUDIO_OPUS_BITRATE = os.getenv('AUDIO_OPUS_BITRATE', '24k')
+
+# Admission control (api/admission.py): concurrency limit per endpoint (URL
+# name=limit, comma separated), a bounded queue of waiters per endpoint, and
+# a token bucket per client address (requests/s and burst; rate 0, the
+# default, disables it). Only turn the rate limit on together with
+# ADMISSION_PROXY_HOPS, the number of trusted proxies that append to
+# X-Forwarded-For (Railway: 1): without it every client behind the proxy
+# shares the proxy's bucket. All limits are per worker process, so the
+# concurrency limits only take effect in workers that serve requests
+# concurrently (ASGI, or gunicorn --threads); a sync worker handles one
+# request at a time and gunicorn's own backlog does the queueing.
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'True') == 'True'
+ADMISSION_CONCURRENCY = {
+    name.strip(): int(limit)
+    for name, limit in (
+        item.split('=') for item in os.getenv(
+            'ADMISSION_CONCURRENCY', 'get_question=16,submit_answer=8,submit_answer_stream=8'
+        ).split(',') if item.strip()
+    )
+}
+ADMISSION_QUEUE = int(os.getenv('ADMISSION_QUEUE', '16'))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '5'))  # seconds
+ADMISSION_RATE = float(os.getenv('ADMISSION_RATE', '0'))
+ADMISSION_BURST = int(os.getenv('ADMISSION_BURST', '10'))
+ADMISSION_PROXY_HOPS = int(os.getenv('ADMISSION_PROXY_HOPS', '0'))
+ADMISSION_RETRY_AFTER_MAX = int(os.getenv('ADMISSION_RETRY_AFTER_MAX', '60'))  # seconds
+
+# Import the URLconf, the Gemini SDK and the transcriber (loading the Vosk
+# model) when the WSGI/ASGI application is created rather than on the first
+# request. gunicorn.conf.py turns it on with GUNICORN_PRELOAD=True so this
+# happens once before the workers fork (see api/startup.py).
+STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', 'False') == 'True'
+
 # Temporary file settings for audio processing
 TEMP_FILE_DIR = BASE_DIR / 'temp'
 TEMP_FILE_DIR.mkdir(exist_ok=True)
@@ -291,7 +473,12 @@ if not DEBUG:
 
 
 # Session settings
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# cached_db reads sessions from the cache and only writes through to the
+# database, so session lookups stay off the SQLite file lock
+SESSION_ENGINE = os.getenv(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if SQLITE_TUNING else 'django.contrib.sessions.backends.db',
+)
 SESSION_COOKIE_AGE = 86400  # 24 hours
 SESSION_SAVE_EVERY_REQUEST = False
 
@@ -301,5 +488,32 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
+    },
+    # Shared by all workers - holds live interview sessions.
+    # Run `python manage.py createcachetable` for the database backend,
+    # or point it at Redis/Memcached for multi-node deployments.
+    'interviews': {
+        'BACKEND': os.getenv('INTERVIEW_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.getenv('INTERVIEW_CACHE_LOCATION', 'interview_cache'),
+    },
+}
+if CACHES['interviews']['BACKEND'].endswith(('DatabaseCache', 'LocMemCache', 'FileBasedCache')):
+    # Django's default of 300 entries would cull live sessions under load
+    CACHES['interviews']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('INTERVIEW_CACHE_MAX_ENTRIES', '100000')),
     }
+
+
+# Interview session store
+INTERVIEW_SESSION_STORE = {
+    'BACKEND': os.getenv('INTERVIEW_SESSION_BACKEND', 'api.sessions.CacheSessionStore'),
+    'OPTIONS': {
+        'CACHE_ALIAS': 'interviews',
+        'TTL': int(os.getenv('INTERVIEW_SESSION_TTL', '7200')),  # 2 hours idle
+        'LOCK_TIMEOUT': int(os.getenv('INTERVIEW_SESSION_LOCK_TIMEOUT', '120')),
+        'LOCK_WAIT': int(os.getenv('INTERVIEW_SESSION_LOCK_WAIT', '60')),
+        # Only used by api.sessions.LocalMemorySessionStore
+        'MAX_ENTRIES': int(os.getenv('INTERVIEW_SESSION_MAX_ENTRIES', '1000')),
+        'MAX_BYTES': int(os.getenv('INTERVIEW_SESSION_MAX_BYTES', str(64 * 1024 * 1024))),
+    },
 }
\ No newline at end of file
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mockmate.settings')
 
 application = get_wsgi_application()
+
+# Optional warm-up (STARTUP_WARMUP) and the startup-time report, see api/startup.py
+from api import startup  # noqa: E402
+
+startup.application_ready()
@@ -3,6 +3,28 @@ import '../Interview/Interview.css'
 
 import toast from "react-hot-toast";
 
+// Anonymous ID that links this browser's interviews to the server-side history
+const getClientId = () => {
+    let clientId = localStorage.getItem('clientId');
+    if (!clientId) {
+        clientId = crypto.randomUUID();
+        localStorage.setItem('clientId', clientId);
+    }
+    return clientId;
+};
+
+// When the server sheds load (429/503) wait for its Retry-After and try again;
+// resending an answer is safe, the server replays the stored reply
+const fetchWithRetry = async (url, options, retries = 2) => {
+    for (let attempt = 0; ; attempt++) {
+        const response = await fetch(url, options);
+        if (![429, 503].includes(response.status) || attempt >= retries) return response;
+        const wait = Math.min(Number(response.headers.get('Retry-After')) || 1, 30);
+        toast(`Server is busy, retrying in ${wait}s...`);
+        await new Promise((resolve) => setTimeout(resolve, wait * 1000));
+    }
+};
+
 export default function Interview() {
 
     const API_URL = import.meta.env.VITE_API_URL
@@ -159,7 +181,7 @@ export default function Interview() {
             setFeedback('');
             setTranscript('');
 
-            const response = await fetch(`${API_URL}/question/?topic=${encodeURIComponent(topic)}`);
+            const response = await fetchWithRetry(`${API_URL}/question/?topic=${encodeURIComponent(topic)}&client_id=${getClientId()}`);
 
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
@@ -301,7 +323,7 @@ export default function Interview() {
 
             toast.success('Checking your answer...');
 
-            const response = await fetch(`${API_URL}/answer/`, {
+            const response = await fetchWithRetry(`${API_URL}/answer/`, {
                 method: 'POST',
                 body: formData,
             });
@@ -357,6 +379,19 @@ export default function Interview() {
         }
     };
 
+    const waitForSummary = async (jobId) => {
+        while (true) {
+            await new Promise((resolve) => setTimeout(resolve, 1500));
+
+            const response = await fetch(`${API_URL}/end/${jobId}/`);
+            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+
+            const job = await response.json();
+            if (job.status === 'done') return job.result;
+            if (job.status === 'failed') throw new Error(job.error);
+        }
+    };
+
     const endInterview = async () => {
         try {
             setLoading(true);
@@ -374,7 +409,12 @@ export default function Interview() {
 
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
 
-            const data = await response.json();
+            let data = await response.json();
+
+            // 202: the evaluation runs in the background, poll until it's ready
+            if (response.status === 202) {
+                data = await waitForSummary(data.job_id);
+            }
 
             if (data.error) throw new Error(data.error);
 